@@ -0,0 +1,92 @@
+"""Speed and accuracy of the HTML job-description extractor on saved career pages.
+
+Compares the current single-pass extractor (services.jd_extract) against the
+previous selector/get_text one, on bench/fixtures/pages (see manifest.json for
+the phrases each page's JD must contain and the boilerplate it must not).
+
+Run from api/:
+    python -m bench.bench_jd_extract [--rounds 20]
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from services.jd_extract import _clean_ws, _extract_best_block
+
+PAGES = Path(__file__).parent / "fixtures" / "pages"
+
+def legacy_best_block(html: str) -> str:
+    # the pre-scoring extractor: longest text among main/article/body and 13 CSS selectors
+    soup = BeautifulSoup(html, "lxml")
+    for tag in soup(["script", "style", "noscript", "svg", "nav", "footer", "header", "form"]):
+        tag.decompose()
+    selectors = [
+        "#job", "#job-description", "#job_description", "#jobDescriptionText",
+        ".job", ".job-description", ".jobDescription", ".description",
+        ".posting", ".posting-description", ".content", ".content-body",
+        "[data-qa='job-description']",
+    ]
+    best_text, best_len = "", 0
+    for container in [soup.find("main"), soup.find("article"), soup.body]:
+        if not container:
+            continue
+        txt = _clean_ws(container.get_text("\n"))
+        if len(txt) > best_len:
+            best_text, best_len = txt, len(txt)
+    for sel in selectors:
+        for n in soup.select(sel):
+            txt = _clean_ws(n.get_text("\n"))
+            if len(txt) > best_len:
+                best_text, best_len = txt, len(txt)
+    if best_len < 200:
+        best_text = _clean_ws(soup.get_text("\n"))
+    lines = [ln.strip() for ln in best_text.splitlines() if len(ln.strip()) >= 3]
+    dedup, seen = [], set()
+    for ln in lines:
+        if ln.lower() not in seen:
+            seen.add(ln.lower())
+            dedup.append(ln)
+    return "\n".join(dedup)
+
+def current_best_block(html: str) -> str:
+    return _extract_best_block(BeautifulSoup(html, "lxml"))
+
+def score(text: str, expected: list[str], noise: list[str]) -> tuple[float, float]:
+    recall = sum(p in text for p in expected) / len(expected)
+    clean = sum(p not in text for p in noise) / len(noise)
+    return recall, clean
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+
+    manifest = json.loads((PAGES / "manifest.json").read_text())
+    pages = {name: (PAGES / name).read_text() for name in manifest}
+
+    print(f"{'page':28} {'extractor':8} {'ms/page':>8} {'recall':>7} {'clean':>6} {'chars':>6}")
+    totals = {}
+    for name, html in pages.items():
+        spec = manifest[name]
+        for label, fn in (("legacy", legacy_best_block), ("current", current_best_block)):
+            t0 = time.perf_counter()
+            for _ in range(args.rounds):
+                text = fn(html)
+            ms = (time.perf_counter() - t0) / args.rounds * 1000
+            recall, clean = score(text, spec["expected"], spec["noise"])
+            agg = totals.setdefault(label, [0.0, 0.0, 0.0])
+            agg[0] += ms
+            agg[1] += recall
+            agg[2] += clean
+            print(f"{name:28} {label:8} {ms:8.2f} {recall:7.2f} {clean:6.2f} {len(text):6d}")
+
+    n = len(pages)
+    print()
+    for label, (ms, recall, clean) in totals.items():
+        print(f"{label:8} total {ms:8.2f} ms   mean recall {recall / n:.2f}   mean clean {clean / n:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Micro-benchmark for services/pdf: text wrapping and full renders of long resumes.
+
+Run from api/:
+    python -m bench.bench_pdf [--renders 50] [--roles 12]
+"""
+import argparse
+import random
+import time
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from services.pdf import TextWrapper, render_resume_pdf
+
+WORDS = (
+    "designed built scaled migrated owned led improved automated Python FastAPI Postgres Kafka "
+    "Kubernetes Terraform services pipelines latency reliability observability customers teams "
+    "platform APIs React TypeScript caching queues batch streaming data models deployments across "
+    "multiple regions with on-call ownership and code review mentoring"
+).split()
+
+def long_resume(roles: int, bullets: int = 8, seed: int = 7) -> str:
+    rnd = random.Random(seed)
+
+    def sentence(n: int) -> str:
+        return " ".join(rnd.choice(WORDS) for _ in range(n))
+
+    out = ["Jane Doe", "jane@example.com | Remote", "", "SUMMARY", sentence(80), "", "EXPERIENCE"]
+    for r in range(roles):
+        out.append(f"Senior Software Engineer | Company {r} | 2015 - 2024")
+        out += [f"- {sentence(rnd.randint(25, 60))}" for _ in range(bullets)]
+        out.append("")
+    out += ["EDUCATION", "BSc Computer Science, State University, 2014", "", "SKILLS"]
+    out += [f"• Area {k}: {', '.join(rnd.sample(WORDS, 10))}" for k in range(12)]
+    return "\n".join(out)
+
+def legacy_wrap(text: str, font: str, size: float, avail_width: float) -> list[str]:
+    # the pre-TextWrapper algorithm: re-measures the growing line for every word
+    words = text.split()
+    if not words:
+        return [""]
+    lines: list[str] = []
+    cur = words[0]
+    for w in words[1:]:
+        test = cur + " " + w
+        if stringWidth(test, font, size) <= avail_width:
+            cur = test
+        else:
+            lines.append(cur)
+            cur = w
+    lines.append(cur)
+    return lines
+
+def bench_wrap(text: str, rounds: int = 200):
+    paragraphs = [ln for ln in text.splitlines() if ln.strip()]
+    args = ("Helvetica", 10.5, 470.0)
+
+    for p in paragraphs:
+        assert legacy_wrap(p, *args) == TextWrapper().wrap(p, *args), p
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for p in paragraphs:
+            legacy_wrap(p, *args)
+    legacy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        w = TextWrapper()  # fresh per round, like a render; word widths stay warm
+        for p in paragraphs:
+            w.wrap(p, *args)
+    new = time.perf_counter() - t0
+
+    print(f"wrap  legacy {rounds / legacy:8.1f} docs/s   new {rounds / new:8.1f} docs/s   speedup x{legacy / new:.1f}")
+
+def bench_render(text: str, renders: int):
+    render_resume_pdf(text)  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(renders):
+        render_resume_pdf(text)
+    dt = time.perf_counter() - t0
+    print(f"render {renders / dt:8.1f} renders/s  ({dt / renders * 1000:.1f} ms each)")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--renders", type=int, default=50)
+    ap.add_argument("--roles", type=int, default=12)
+    args = ap.parse_args()
+
+    text = long_resume(args.roles)
+    print(f"resume: {len(text)} chars, {len(text.splitlines())} lines")
+    bench_wrap(text)
+    bench_render(text, args.renders)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Drive services/ollama_pool against local stub servers.
+
+Starts three stub Ollama servers, sends concurrent chats through the pool and
+checks that load is spread, that a backend which goes down is ejected (and
+gets no more traffic), and that the next health probe re-admits it once it
+recovers. Exits non-zero on a failed check.
+
+Run from api/:
+    python -m bench.check_ollama_pool
+"""
+import asyncio
+import sys
+
+import httpx
+
+from bench.stub_llm import serve
+from services.ollama_pool import OllamaPool
+
+async def chat(pool: OllamaPool, client: httpx.AsyncClient) -> bool:
+    try:
+        async with pool.lease() as node:
+            r = await client.post(f"{node.url}/api/chat", json={"model": "m", "messages": []}, timeout=5)
+            if r.status_code >= 500:
+                pool.failed(node, f"status={r.status_code}")
+                return False
+            pool.succeeded(node)
+            return True
+    except httpx.TransportError:
+        return False
+
+async def run() -> list[str]:
+    stubs = [serve(latency=0.05) for _ in range(3)]
+    urls = [f"http://127.0.0.1:{s.server_port}" for s, _ in stubs]
+    problems = []
+
+    async with httpx.AsyncClient() as client:
+        pool = OllamaPool(urls, client, "5m", eject_after=2, probe_interval_seconds=0)
+
+        ok = await asyncio.gather(*(chat(pool, client) for _ in range(30)))
+        spread = [state.chat_calls for _, state in stubs]
+        print("healthy spread:", spread)
+        if not all(ok) or min(spread) < 8:
+            problems.append(f"uneven or failed spread: {spread}")
+
+        # backend 0 goes down: failed requests plus a probe eject it
+        stubs[0][1].down = True
+        await asyncio.gather(*(chat(pool, client) for _ in range(6)))
+        await pool.probe_all()
+        if pool.nodes[0].healthy:
+            problems.append("down backend was not ejected")
+
+        before = stubs[0][1].chat_calls
+        ok = await asyncio.gather(*(chat(pool, client) for _ in range(20)))
+        print("after eject:", [state.chat_calls for _, state in stubs], pool.snapshot()[urls[0]])
+        if not all(ok) or stubs[0][1].chat_calls != before:
+            problems.append("ejected backend still received traffic")
+
+        # recovery: one good probe re-admits it
+        stubs[0][1].down = False
+        await pool.probe_all()
+        if not pool.nodes[0].healthy:
+            problems.append("recovered backend was not re-admitted")
+        await asyncio.gather(*(chat(pool, client) for _ in range(12)))
+        if stubs[0][1].chat_calls == before:
+            problems.append("re-admitted backend got no traffic")
+        print("after re-admit:", [state.chat_calls for _, state in stubs])
+
+    for server, _ in stubs:
+        server.shutdown()
+    return problems
+
+def main():
+    problems = asyncio.run(run())
+    for p in problems:
+        print("FAIL", p)
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""Offline end-to-end load benchmark for the API.
+
+Runs the app in-process (ASGI, with its lifespan) against:
+  - bench/stub_llm for Ollama and DeepSeek, with configurable latency and
+    token rate,
+  - the recorded corpus in bench/fixtures: ATS API payloads (fixtures/ats)
+    and saved career pages (fixtures/pages). The JD fetcher gets them through
+    an httpx transport instead of the network.
+
+For each scenario it prints p50/p95/p99 latency, requests/sec, errors and peak
+RSS (the API process plus live PDF workers). Then it prints per-stage numbers
+taken from /metrics deltas: JD fetch per strategy, LLM call per provider, PDF
+render and ZIP assembly. Peak RSS only grows, so each row shows the high-water
+mark up to and including that scenario.
+
+Caches are off by default (JD revalidated every time, no PDF cache, LLM
+cache_mode=bypass), so repeated runs measure the same work; --warm keeps them.
+
+Run from api/:
+    python -m bench.load [--scenarios extract_jd,tailor,tailor_stream,resume_pdf,batch_zip,rank]
+        [--requests 40] [--concurrency 8] [--provider ollama|deepseek]
+        [--latency 0.2] [--token-rate 0] [--fetch-latency 0.05] [--warm]
+        [--save out.json] [--baseline out.json --max-regression 0.25]
+With --baseline, exits non-zero if any scenario's p95 got slower or its
+requests/sec dropped by more than --max-regression.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import httpx
+
+from bench.bench_pdf import long_resume
+from bench.stub_llm import serve
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PAGE_HOST = "https://careers.fixtures.test"
+SCENARIOS = ("extract_jd", "tailor", "tailor_stream", "resume_pdf", "batch_zip", "rank")
+# histogram -> labels that split it into stages
+STAGES = {
+    "jd_fetch_seconds": ("strategy",),
+    "llm_call_seconds": ("provider", "outcome"),
+    "pdf_render_seconds": (),
+    "zip_assembly_seconds": ("kind",),
+}
+JD_TEXT = (
+    "We are hiring a backend engineer to design, build and operate Python services. "
+    "Requirements: FastAPI, PostgreSQL, Kafka, Kubernetes, observability, on-call ownership, "
+    "code review and mentoring. Nice to have: Terraform, React, data pipelines."
+)
+
+# -------------------------
+# Fixture corpus served to the JD fetcher
+# -------------------------
+def fixture_corpus() -> tuple[dict[str, tuple[str, bytes]], list[str]]:
+    # ({request url: (content type, body)}, posting urls)
+    routes: dict[str, tuple[str, bytes]] = {}
+    urls: list[str] = []
+    for path in sorted((FIXTURES / "ats").glob("*.json")):
+        fx = json.loads(path.read_text())
+        routes[fx["api_url"]] = ("application/json", json.dumps(fx["payload"]).encode())
+        urls.append(fx["url"])
+    for path in sorted((FIXTURES / "pages").glob("*.html")):
+        url = f"{PAGE_HOST}/{path.stem}"
+        routes[url] = ("text/html; charset=utf-8", path.read_bytes())
+        urls.append(url)
+    return routes, urls
+
+def fixture_transport(routes: dict[str, tuple[str, bytes]], latency: float) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if latency:
+            await asyncio.sleep(latency)
+        hit = routes.get(str(request.url))
+        if hit is None:
+            return httpx.Response(404, text="not in fixtures")
+        content_type, body = hit
+        return httpx.Response(200, content=body, headers={"Content-Type": content_type})
+    return httpx.MockTransport(handler)
+
+# -------------------------
+# Measurements
+# -------------------------
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux; live children (PDF workers) via /proc VmHWM
+    total_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    for child in multiprocessing.active_children():
+        try:
+            status = Path(f"/proc/{child.pid}/status").read_text()
+        except OSError:
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmHWM:"):
+                total_kb += int(line.split()[1])
+    return total_kb / 1024
+
+def parse_histograms(text: str) -> dict[tuple, dict]:
+    # {(metric, (label values...)): {"count", "sum", "buckets": {le: cumulative}}}
+    from prometheus_client.parser import text_string_to_metric_families
+
+    out: dict[tuple, dict] = {}
+    for family in text_string_to_metric_families(text):
+        if family.name not in STAGES:
+            continue
+        for s in family.samples:
+            key = (family.name, tuple(s.labels.get(l, "") for l in STAGES[family.name]))
+            h = out.setdefault(key, {"count": 0.0, "sum": 0.0, "buckets": {}})
+            if s.name.endswith("_bucket"):
+                h["buckets"][float(s.labels["le"])] = s.value
+            elif s.name.endswith("_count"):
+                h["count"] = s.value
+            elif s.name.endswith("_sum"):
+                h["sum"] = s.value
+    return out
+
+def stage_deltas(before: dict, after: dict) -> dict[str, dict]:
+    out = {}
+    for key, h in after.items():
+        prev = before.get(key, {"count": 0.0, "sum": 0.0, "buckets": {}})
+        count = h["count"] - prev["count"]
+        if count <= 0:
+            continue
+        # p95 upper bound from bucket deltas
+        p95 = None
+        for le in sorted(h["buckets"]):
+            if h["buckets"][le] - prev["buckets"].get(le, 0.0) >= 0.95 * count:
+                p95 = le
+                break
+        name = key[0].removesuffix("_seconds") + "".join(f"[{v}]" for v in key[1] if v)
+        out[name] = {"count": int(count), "mean_ms": (h["sum"] - prev["sum"]) / count * 1000, "p95_le_s": p95}
+    return out
+
+# -------------------------
+# Scenarios
+# -------------------------
+def build_requests(provider: str, cache_mode: str, urls: list[str], resume: str) -> dict:
+    def tailor_body(i: int) -> dict:
+        return {
+            "resume_text": resume,
+            "jd_text": f"{JD_TEXT} Posting #{i}.",
+            "tolerance": 30,
+            "provider": provider,
+            "cache_mode": cache_mode,
+        }
+
+    return {
+        "extract_jd": lambda i: ("/extract_jd", {"url": urls[i % len(urls)]}),
+        "tailor": lambda i: ("/tailor", tailor_body(i)),
+        "tailor_stream": lambda i: ("/tailor/stream", tailor_body(i)),
+        "resume_pdf": lambda i: ("/resume_pdf", {"resume_text": f"{resume}\n- variant {i}"}),
+        "batch_zip": lambda i: ("/batch_zip", {
+            "base_resume_text": resume,
+            "job_urls": [urls[(i + k) % len(urls)] for k in range(min(10, len(urls)))],
+            "tolerance": 30,
+            "provider": provider,
+            "cache_mode": cache_mode,
+        }),
+        "rank": lambda i: ("/rank", {
+            "resume_text": resume,
+            "jd_texts": [f"{JD_TEXT} Posting #{i}-{k}." for k in range(200)],
+            "job_urls": urls,
+        }),
+    }
+
+def failed(name: str, r: httpx.Response) -> bool:
+    if r.status_code >= 400:
+        return True
+    if name == "tailor_stream":
+        return "event: error" in r.text
+    return False
+
+async def run_scenario(client: httpx.AsyncClient, name: str, make, n: int, concurrency: int) -> dict:
+    slots = asyncio.Semaphore(max(1, concurrency))
+    latencies: list[float] = []
+    errors: dict[str, int] = defaultdict(int)
+
+    async def one(i: int):
+        path, body = make(i)
+        async with slots:
+            t0 = time.perf_counter()
+            try:
+                r = await client.post(path, json=body)
+                bad = failed(name, r)
+                reason = f"status {r.status_code}"
+            except Exception as e:
+                bad, reason = True, type(e).__name__
+            latencies.append(time.perf_counter() - t0)
+            if bad:
+                errors[reason] += 1
+
+    before = parse_histograms((await client.get("/metrics")).text)
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    elapsed = time.perf_counter() - t0
+    after = parse_histograms((await client.get("/metrics")).text)
+
+    lat = sorted(latencies)
+    return {
+        "requests": n,
+        "concurrency": concurrency,
+        "errors": sum(errors.values()),
+        "error_kinds": dict(errors),
+        "p50_ms": percentile(lat, 50) * 1000,
+        "p95_ms": percentile(lat, 95) * 1000,
+        "p99_ms": percentile(lat, 99) * 1000,
+        "rps": n / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stage_deltas(before, after),
+    }
+
+def print_results(results: dict):
+    print(f"\n{'scenario':14} {'reqs':>5} {'err':>4} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'peak MB':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:14} {r['requests']:5d} {r['errors']:4d} {r['p50_ms']:9.1f} {r['p95_ms']:9.1f} "
+            f"{r['p99_ms']:9.1f} {r['rps']:8.2f} {r['peak_rss_mb']:8.1f}"
+        )
+    for name, r in results.items():
+        if r["error_kinds"]:
+            print(f"  {name} errors: {r['error_kinds']}")
+    print(f"\n{'scenario':14} {'stage':32} {'count':>6} {'mean ms':>9} {'p95 <= s':>9}")
+    for name, r in results.items():
+        for stage, s in sorted(r["stages"].items()):
+            p95 = "" if s["p95_le_s"] is None else f"{s['p95_le_s']:g}"
+            print(f"{name:14} {stage:32} {s['count']:6d} {s['mean_ms']:9.1f} {p95:>9}")
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list[str]:
+    problems = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if base["p95_ms"] > 0 and r["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            problems.append(f"{name}: p95 {r['p95_ms']:.1f} ms vs baseline {base['p95_ms']:.1f} ms")
+        if base["rps"] > 0 and r["rps"] < base["rps"] * (1 - max_regression):
+            problems.append(f"{name}: {r['rps']:.2f} req/s vs baseline {base['rps']:.2f} req/s")
+    return problems
+
+# -------------------------
+# Main
+# -------------------------
+async def run(args) -> dict:
+    # app modules read their configuration at import time
+    import main
+    from services import jd_extract
+
+    routes, urls = fixture_corpus()
+    jd_extract.CLIENT = httpx.AsyncClient(
+        transport=fixture_transport(routes, args.fetch_latency), follow_redirects=True
+    )
+    makers = build_requests(args.provider, "default" if args.warm else "bypass", urls, long_resume(roles=4))
+
+    results = {}
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for name in args.scenarios:
+                n = max(1, args.requests // 10) if name == "batch_zip" else args.requests
+                print(f"running {name}: {n} requests, concurrency {args.concurrency}", file=sys.stderr)
+                results[name] = await run_scenario(client, name, makers[name], n, args.concurrency)
+    return results
+
+def main_cli():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--requests", type=int, default=40)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--provider", choices=("ollama", "deepseek"), default="ollama")
+    ap.add_argument("--latency", type=float, default=0.2, help="stub LLM seconds to first token")
+    ap.add_argument("--token-rate", type=float, default=0, help="stub LLM tokens/sec (0 = instant)")
+    ap.add_argument("--fetch-latency", type=float, default=0.05, help="seconds per fixture HTTP response")
+    ap.add_argument("--warm", action="store_true", help="keep JD/PDF/LLM caches on")
+    ap.add_argument("--save")
+    ap.add_argument("--baseline")
+    ap.add_argument("--max-regression", type=float, default=0.25)
+    args = ap.parse_args()
+    args.scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        ap.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    stub, _ = serve(latency=args.latency, token_rate=args.token_rate)
+    stub_url = f"http://127.0.0.1:{stub.server_port}"
+    workdir = tempfile.mkdtemp(prefix="bench-load-")
+    os.environ.update({
+        "OLLAMA_URLS": stub_url,
+        "DEEPSEEK_URL": f"{stub_url}/v1/chat/completions",
+        "DEEPSEEK_API_KEY": os.environ.get("DEEPSEEK_API_KEY") or "bench",
+        "JOBS_DB_PATH": f"{workdir}/jobs.sqlite3",
+        "JOBS_DIR": f"{workdir}/jobs",
+    })
+    for name in ("LLM_CACHE_PATH", "JD_CACHE_PATH", "PDF_CACHE_PATH"):
+        os.environ.pop(name, None)
+    if not args.warm:
+        os.environ["JD_CACHE_TTL_SECONDS"] = "0"
+        os.environ["PDF_CACHE_MAX_ITEMS"] = "0"
+
+    results = asyncio.run(run(args))
+    stub.shutdown()
+    print_results(results)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+    if args.baseline:
+        problems = compare(results, json.loads(Path(args.baseline).read_text()), args.max_regression)
+        for p in problems:
+            print("REGRESSION", p)
+        sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,57 @@
+"""Replay recorded ATS API payloads through the adapter registry, offline.
+
+For every bench/fixtures/ats/*.json fixture this checks that the posting URL
+resolves to the right adapter and JSON endpoint, that the extracted text
+passes the JD check and contains the expected phrases, and reports payload
+size and extraction time.
+
+Run from api/:
+    python -m bench.replay_ats
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+from services import ats
+from services.jd_extract import ats_text
+
+FIXTURES = Path(__file__).parent / "fixtures" / "ats"
+
+def replay(path: Path, rounds: int = 200) -> list[str]:
+    fx = json.loads(path.read_text())
+    problems = []
+
+    hit = ats.resolve(fx["url"])
+    if hit is None:
+        return [f"{path.name}: no adapter for {fx['url']}"]
+    adapter, ids = hit
+    if adapter.name != path.stem:
+        problems.append(f"{path.name}: resolved to {adapter.name}")
+    if adapter.api_url(ids) != fx["api_url"]:
+        problems.append(f"{path.name}: api_url {adapter.api_url(ids)} != {fx['api_url']}")
+
+    body = json.dumps(fx["payload"])
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        text = ats_text(adapter.extract(json.loads(body), ids))
+    ms = (time.perf_counter() - t0) / rounds * 1000
+
+    if not text:
+        problems.append(f"{path.name}: extracted text rejected by JD check")
+    else:
+        problems += [f"{path.name}: missing {p!r}" for p in fx["expected"] if p not in text]
+
+    print(f"{adapter.name:16} {len(body):7d} B payload  {ms:6.2f} ms/extract  {len(text or ''):5d} chars")
+    return problems
+
+def main():
+    problems = []
+    for path in sorted(FIXTURES.glob("*.json")):
+        problems += replay(path)
+    for p in problems:
+        print("FAIL", p)
+    sys.exit(1 if problems else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Stub LLM server for exercising the API without a GPU or an API key.
+
+Speaks both APIs the app uses:
+  - Ollama: /api/chat (plain and NDJSON streaming), /api/generate (model
+    load), /api/tags, /api/ps
+  - OpenAI-style (DeepSeek): /v1/chat/completions and /chat/completions
+    (plain and SSE streaming, with usage when stream_options.include_usage)
+
+Each reply waits `latency` seconds (time to first token), then produces
+tokens at `token_rate` per second (0 = instantly). The reply is the BASE
+RESUME section of the prompt, so the EDUCATION check passes. Parse prompts
+("RESUME:" / "JOB DESCRIPTION:") get a line-based JSON parse of the text.
+
+Run from api/:
+    python -m bench.stub_llm [--port 11434] [--latency 0.5] [--token-rate 0]
+Point the API at it with OLLAMA_URLS=http://127.0.0.1:<port> and/or
+DEEPSEEK_URL=http://127.0.0.1:<port>/v1/chat/completions (plus any DEEPSEEK_API_KEY).
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESUME_SECTION_RE = re.compile(r"BASE RESUME[^\n]*:\n(.*?)(?:\n\n[A-Z][A-Z ]+:\n|\Z)", re.S)
+PARSE_RE = re.compile(r"(RESUME|JOB DESCRIPTION):\n(.*)", re.S)
+SECTIONS = {"SUMMARY", "EDUCATION", "EXPERIENCE", "SKILLS", "PROJECTS", "CERTIFICATIONS", "AWARDS"}
+TERM_RE = re.compile(r"\b[A-Z][A-Za-z0-9+#.]+\b")
+
+class StubState:
+    def __init__(self, latency: float = 0.5, token_rate: float = 0):
+        self.latency = latency
+        self.token_rate = token_rate
+        self.down = False  # simulate a dead backend: every request gets a 503
+        self.fail_next = 0  # simulate blips: the next N chats get a 503
+        self.loaded: set[str] = set()
+        self.chat_calls = 0
+        self.lock = threading.Lock()
+
+    def token_delay(self) -> float:
+        return 1 / self.token_rate if self.token_rate > 0 else 0
+
+def _parse_resume(text: str) -> dict:
+    out = {"header": [], "summary": None, "skills": [], "experience": [], "education": [], "extra_sections": {}}
+    section = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if line.upper() in SECTIONS:
+            section = line.upper()
+            continue
+        item = line.lstrip("-•* ").strip()
+        if section is None:
+            out["header"].append(line)
+        elif section == "SUMMARY":
+            out["summary"] = f"{out['summary']} {line}" if out["summary"] else line
+        elif section == "EXPERIENCE":
+            if line[0] in "-•*" and out["experience"]:
+                out["experience"][-1]["bullets"].append(item)
+            else:
+                role, company, dates = (line.split(" | ") + [None, None])[:3]
+                out["experience"].append({"role": role, "company": company, "dates": dates, "bullets": []})
+        elif section == "EDUCATION":
+            out["education"].append(item)
+        elif section == "SKILLS":
+            out["skills"].append(item)
+        else:
+            out["extra_sections"].setdefault(section, []).append(item)
+    return out
+
+def _parse_jd(text: str) -> dict:
+    terms = list(dict.fromkeys(TERM_RE.findall(text)))
+    return {"title": text.split(".")[0][:80], "must_have": terms[:8], "nice_to_have": terms[8:12],
+            "responsibilities": [], "keywords": terms}
+
+def _reply_text(body: dict) -> str:
+    user = next((m["content"] for m in body.get("messages") or [] if m.get("role") == "user"), "")
+    p = PARSE_RE.match(user)
+    if p:
+        return json.dumps(_parse_resume(p.group(2)) if p.group(1) == "RESUME" else _parse_jd(p.group(2)))
+    m = RESUME_SECTION_RE.search(user)
+    return (m.group(1).strip() if m else user[:2000]) or "stub reply"
+
+def _tokens(text: str) -> list[str]:
+    # one "token" per word, keeping the whitespace that follows it
+    return re.findall(r"\S+\s*", text) or [text]
+
+def make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _json(self, obj, status: int = 200):
+            self._send(status, json.dumps(obj).encode())
+
+        def _stream(self, chunks, content_type: str):
+            # chunked transfer, so the client sees tokens as they are produced
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for chunk in chunks:
+                data = chunk.encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def _generate(self, tokens: list[str]):
+            delay = state.token_delay()
+            for tok in tokens:
+                if delay:
+                    time.sleep(delay)
+                yield tok
+
+        def do_GET(self):
+            if state.down:
+                return self._json({"error": "down"}, 503)
+            if self.path == "/api/tags":
+                return self._json({"models": [{"name": m} for m in sorted(state.loaded)]})
+            if self.path == "/api/ps":
+                return self._json({"models": [{"name": m, "model": m} for m in sorted(state.loaded)]})
+            self._json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            if state.down:
+                return self._json({"error": "down"}, 503)
+            model = body.get("model") or "stub"
+
+            if self.path == "/api/generate":
+                time.sleep(state.latency)
+                state.loaded.add(model)
+                return self._json({"model": model, "response": "", "done": True})
+
+            if self.path not in ("/api/chat", "/v1/chat/completions", "/chat/completions"):
+                return self._json({"error": "not found"}, 404)
+
+            with state.lock:
+                state.chat_calls += 1
+                blip = state.fail_next > 0
+                state.fail_next -= blip
+            if blip:
+                return self._json({"error": "transient"}, 503)
+
+            state.loaded.add(model)
+            time.sleep(state.latency)
+            tokens = _tokens(_reply_text(body))
+            prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages") or [])
+
+            if self.path == "/api/chat":
+                self._ollama(body, model, tokens, prompt_tokens)
+            else:
+                self._openai(body, model, tokens, prompt_tokens)
+
+        def _ollama(self, body: dict, model: str, tokens: list[str], prompt_tokens: int):
+            usage = {"prompt_eval_count": prompt_tokens, "eval_count": len(tokens)}
+            if not body.get("stream"):
+                text = "".join(self._generate(tokens))
+                return self._json({"model": model, "message": {"role": "assistant", "content": text}, "done": True, **usage})
+
+            def lines():
+                for tok in self._generate(tokens):
+                    yield json.dumps({"model": model, "message": {"content": tok}, "done": False}) + "\n"
+                yield json.dumps({"model": model, "message": {"content": ""}, "done": True, **usage}) + "\n"
+            self._stream(lines(), "application/x-ndjson")
+
+        def _openai(self, body: dict, model: str, tokens: list[str], prompt_tokens: int):
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(tokens),
+                "total_tokens": prompt_tokens + len(tokens),
+                "prompt_cache_hit_tokens": 0,
+            }
+            cid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+            if not body.get("stream"):
+                text = "".join(self._generate(tokens))
+                return self._json({
+                    "id": cid,
+                    "object": "chat.completion",
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                    "usage": usage,
+                })
+
+            def events():
+                for tok in self._generate(tokens):
+                    chunk = {"id": cid, "object": "chat.completion.chunk", "model": model,
+                             "choices": [{"index": 0, "delta": {"content": tok}, "finish_reason": None}]}
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    yield f"data: {json.dumps({'id': cid, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+                yield "data: [DONE]\n\n"
+            self._stream(events(), "text/event-stream")
+
+    return Handler
+
+def serve(port: int = 0, latency: float = 0.5, token_rate: float = 0) -> tuple[ThreadingHTTPServer, StubState]:
+    # starts in a daemon thread; port 0 picks a free one (server.server_port)
+    state = StubState(latency, token_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=11434)
+    ap.add_argument("--latency", type=float, default=0.5, help="seconds before the first token")
+    ap.add_argument("--token-rate", type=float, default=0, help="tokens per second after that (0 = instant)")
+    args = ap.parse_args()
+    server, _ = serve(args.port, args.latency, args.token_rate)
+    print(f"stub LLM on http://127.0.0.1:{server.server_port} (Ollama /api/chat, OpenAI /v1/chat/completions)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
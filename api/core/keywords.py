@@ -0,0 +1,79 @@
+import re
+from collections import Counter
+
+# Words that carry no signal about a posting's skills: English function words
+# plus the boilerplate every job description repeats.
+STOPWORDS = frozenset("""
+a about above across after again all also an and any are as at be been being both but by can could
+did do does doing during each either etc for from further had has have having he her here his how
+i if in into is it its itself just may me more most must my no nor not of off on once only or other
+our ours out over own per same she should so some such than that the their them then there these
+they this those through to too under until up us very via was we were what when where which while
+who whom why will with within without would you your yours
+ability able apply applicants benefits candidate candidates company role position job jobs team teams
+work working works join looking seeking opportunity opportunities strong excellent good great plus
+preferred required requirement requirements responsibilities responsibility qualifications
+qualification nice bonus years year experience experienced knowledge understanding familiarity
+skills skill including include includes like well new using use used help ensure make across
+environment equal employer status within based day days time full part hiring hire us
+""".split())
+
+# bigrams don't span list separators or sentence ends ("Go, Rust" is not a phrase)
+PHRASE_BREAK_RE = re.compile(r"[,;:!?()\[\]|•\n]+|\.(?=\s|$)")
+TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9+#./\-]*[A-Za-z0-9+#]|[A-Za-z0-9]")
+
+def tokenize(text: str) -> list[str]:
+    # lowercased tokens; keeps c++, c#, node.js, ci/cd, on-call in one piece
+    return [t.lower() for t in TOKEN_RE.findall(text or "")]
+
+def terms(text: str) -> list[str]:
+    # content unigrams plus bigrams of adjacent content words within a phrase
+    def content(t: str) -> bool:
+        return t not in STOPWORDS and not t.isdigit() and len(t) > 1
+
+    out = [t for t in tokenize(text) if content(t)]
+    for phrase in PHRASE_BREAK_RE.split(text or ""):
+        toks = tokenize(phrase)
+        out += [f"{a} {b}" for a, b in zip(toks, toks[1:]) if content(a) and content(b)]
+    return out
+
+def technical_terms(text: str) -> set[str]:
+    # Kafka, PostgreSQL, AWS, C++, k8s, node.js. A leading capital only
+    # counts mid-sentence.
+    out = set()
+    for m in TOKEN_RE.finditer(text or ""):
+        surface = m.group(0)
+        prev = text[max(0, m.start() - 4):m.start()].rstrip()[-1:]
+        sentence_start = prev in ("", ".", "!", "?", ":", ";", "•", "-", "*")
+        if (
+            any(c.isdigit() or c in "+#./" for c in surface)
+            or any(c.isupper() for c in surface[1:])
+            or (surface[:1].isupper() and not sentence_start)
+        ):
+            out.add(surface.lower())
+    return out
+
+def extract_keywords(text: str, limit: int = 40) -> list[str]:
+    # JD terms ranked by frequency, with a bonus for names of tools and
+    # technologies; bigrams ("machine learning") only when repeated.
+    # Deterministic: ties keep first-seen order.
+    found = terms(text)
+    counts = Counter(found)
+    first_seen: dict[str, int] = {}
+    for i, t in enumerate(found):
+        first_seen.setdefault(t, i)
+    technical = technical_terms(text)
+
+    scores = {}
+    for t, n in counts.items():
+        if " " in t:
+            if n > 1:
+                scores[t] = n * 1.5
+        else:
+            scores[t] = n + (2 if t in technical else 0)
+    return sorted(scores, key=lambda t: (-scores[t], first_seen[t]))[:limit]
+
+def find_term(text: str, term: str) -> str | None:
+    # the term as written in `text` (original casing), or None
+    m = re.search(r"(?<![\w+#])" + re.escape(term) + r"(?![\w+#])", text, re.I)
+    return m.group(0) if m else None
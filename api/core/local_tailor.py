@@ -0,0 +1,97 @@
+import re
+
+from fastapi import HTTPException
+
+from core.keywords import extract_keywords, find_term, technical_terms, terms
+from core.policy import tolerance_profile
+from core.sections import FIXED_SECTIONS, is_bullet, split_roles, split_sections
+
+# -------------------------
+# Local engine: conservative tailoring without an LLM
+#
+# Only does what the conservative policy allows: bullets, projects and skills
+# are reordered by how many JD keywords they contain, and the summary names
+# up to LOCAL_MAX_SURFACED JD technologies that already appear in the
+# resume's bullets or skills. Nothing is added that the resume doesn't
+# already say.
+# -------------------------
+LOCAL_MAX_SURFACED = 6
+
+SKILL_LINE_RE = re.compile(r"^(\s*(?:[•\-*]\s*)?(?:[^:,|;]{1,40}:\s*)?)(.*)$")
+
+def resolve_engine(engine: str, tolerance: int) -> str:
+    # "auto": local for conservative tolerance, the LLM otherwise
+    conservative = tolerance_profile(tolerance) == "conservative"
+    if engine == "local" and not conservative:
+        raise HTTPException(status_code=400, detail="engine=local only supports tolerance < 30 (conservative)")
+    if engine == "auto":
+        return "local" if conservative else "llm"
+    return engine
+
+def _score(text: str, weights: dict[str, int]) -> int:
+    return sum(weights.get(t, 0) for t in set(terms(text)))
+
+def _by_relevance(items: list[str], weights: dict[str, int]) -> list[str]:
+    # stable: equally relevant items keep their original order
+    return sorted(items, key=lambda s: -_score(s, weights))
+
+def _reorder_skill_line(line: str, weights: dict[str, int]) -> str:
+    # "• Cloud: AWS, Kafka, Go" -> same label, items most relevant first
+    prefix, rest = SKILL_LINE_RE.match(line).groups()
+    for sep in (",", "|", ";"):
+        if sep in rest:
+            items = [s.strip() for s in rest.split(sep) if s.strip()]
+            joiner = " | " if sep == "|" else f"{sep} "
+            return prefix + joiner.join(_by_relevance(items, weights))
+    return line
+
+def _surface(lines: list[str], evidence: str, keywords: list[str]) -> list[str]:
+    if not lines or is_bullet(lines[-1]):
+        return lines
+    summary = " ".join(lines)
+    technical = technical_terms(evidence)
+    found: list[str] = []
+    for k in keywords:
+        if k not in technical or find_term(summary, k):
+            continue
+        surface = find_term(evidence, k)
+        if surface:
+            found.append(surface)
+        if len(found) == LOCAL_MAX_SURFACED:
+            break
+    if not found:
+        return lines
+    last = lines[-1].rstrip()
+    sep = "" if last.endswith((".", "!", "?")) else "."
+    return lines[:-1] + [f"{last}{sep} Relevant skills: {', '.join(found)}."]
+
+def _reorder_entries(lines: list[str], weights: dict[str, int]) -> list[str]:
+    # roles / projects: headers stay put, bullets under each are reordered
+    out: list[str] = []
+    for i, (head, bullets) in enumerate(split_roles(lines)):
+        out += ([""] if i else []) + head + _by_relevance(bullets, weights)
+    return out
+
+def tailor_local(resume_text: str, jd_text: str) -> str:
+    keywords = extract_keywords(jd_text)
+    weights = {k: len(keywords) - i for i, k in enumerate(keywords)}
+
+    sections = split_sections(resume_text)
+    # what the candidate actually claims: bullets anywhere, plus the skills list
+    evidence = "\n".join(
+        l for name, lines in sections if name not in FIXED_SECTIONS
+        for l in lines if is_bullet(l) or name == "SKILLS"
+    )
+
+    blocks = []
+    for name, lines in sections:
+        if name is None or name in FIXED_SECTIONS:
+            body = lines
+        elif name == "SUMMARY":
+            body = _surface(lines, evidence, keywords)
+        elif name == "SKILLS":
+            body = _by_relevance([_reorder_skill_line(l, weights) for l in lines if l.strip()], weights)
+        else:
+            body = _reorder_entries(lines, weights)
+        blocks.append("\n".join(([name] if name else []) + body))
+    return "\n\n".join(blocks)
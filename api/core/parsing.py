@@ -0,0 +1,184 @@
+import json
+import logging
+import os
+import re
+
+from core.policy import policy_for_tolerance
+from core.sections import is_bullet
+from schemas import JdJSON, PlanItem, ResumeJSON, TailorPlan
+from services.cache import TieredCache, content_key, env_ttl
+from services.llm import effective_model, extract_json_strict, llm_chat
+from services.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+RESUME_PARSE_SYSTEM = """You convert resumes into JSON. Copy the text verbatim: do not rewrite, summarize, merge or drop anything.
+
+Return ONLY a JSON object with exactly these keys:
+{
+  "header": ["name and contact lines, as written"],
+  "summary": "the summary paragraph, or null",
+  "skills": ["one skill per item, or one 'Category: a, b, c' item per group if skills are grouped"],
+  "experience": [{"company": "...", "role": "...", "dates": "...", "bullets": ["one bullet per item"]}],
+  "education": ["one line per degree or school, with its dates"],
+  "extra_sections": {"SECTION NAME IN CAPS": ["one line per item"]}
+}
+
+Every employer, role, date, bullet, degree, certification and project in the resume must appear in the output.
+"""
+
+JD_PARSE_SYSTEM = """You extract requirements from job descriptions.
+
+Return ONLY a JSON object with exactly these keys:
+{
+  "title": "job title, or null",
+  "must_have": ["required skills, tools or qualifications, short phrases"],
+  "nice_to_have": ["preferred / bonus skills, short phrases"],
+  "responsibilities": ["one responsibility per item, short phrases"],
+  "keywords": ["technologies and domain terms an ATS would match on"]
+}
+
+Do not add anything the job description does not say.
+"""
+
+# Parsed resumes/JDs keyed by hash of the text, provider, model and prompt.
+# A resume is parsed once and reused for every JD it is tailored against.
+PARSE_CACHE = TieredCache(
+    "parse",
+    max_items=int(os.getenv("PARSE_CACHE_MAX_ITEMS", "256")),
+    ttl_seconds=env_ttl("PARSE_CACHE_TTL_SECONDS", str(30 * 24 * 3600)),
+    disk_path=os.getenv("PARSE_CACHE_PATH") or None,
+    disk_max_items=int(os.getenv("PARSE_CACHE_DISK_MAX_ITEMS", "5000")),
+)
+PARSE_IN_FLIGHT = SingleFlight()
+
+# -------------------------
+# LLM parsing
+# -------------------------
+async def _parse(kind: str, system: str, label: str, text: str, provider: str, model: str | None) -> dict:
+    key = content_key(kind, provider, effective_model(provider, model), system, text)
+    hit = await PARSE_CACHE.aget(key)
+    if hit is not None:
+        return json.loads(hit)
+
+    async def call() -> dict:
+        raw = await llm_chat(provider, system, f"{label}:\n{text}", temperature=0.0, model=model)
+        data = extract_json_strict(raw)
+        # validate before caching so a malformed answer is never reused
+        schema = ResumeJSON if kind == "resume" else JdJSON
+        data = schema.model_validate(data).model_dump()
+        await PARSE_CACHE.aset(key, json.dumps(data).encode("utf-8"))
+        return data
+
+    return await PARSE_IN_FLIGHT.do(key, call)
+
+async def parse_resume(resume_text: str, provider: str, model: str | None = None) -> ResumeJSON:
+    return ResumeJSON.model_validate(await _parse("resume", RESUME_PARSE_SYSTEM, "RESUME", resume_text, provider, model))
+
+async def parse_jd(jd_text: str, provider: str, model: str | None = None) -> JdJSON:
+    return JdJSON.model_validate(await _parse("jd", JD_PARSE_SYSTEM, "JOB DESCRIPTION", jd_text, provider, model))
+
+# -------------------------
+# Compact resume text for prompts
+# -------------------------
+def render_resume(resume: ResumeJSON) -> str:
+    # Same section layout the PDF renderer expects, without the blank lines,
+    # decorations and layout whitespace of the original.
+    blocks = []
+    if resume.header:
+        blocks.append("\n".join(resume.header))
+    if resume.summary:
+        blocks.append(f"SUMMARY\n{resume.summary}")
+    if resume.experience:
+        roles = []
+        for e in resume.experience:
+            title = " | ".join(p for p in (e.role, e.company, e.dates) if p)
+            roles.append("\n".join([title] + [f"- {b}" for b in e.bullets]))
+        blocks.append("EXPERIENCE\n" + "\n".join(roles))
+    if resume.education:
+        blocks.append("EDUCATION\n" + "\n".join(resume.education))
+    if resume.skills:
+        grouped = [s for s in resume.skills if ":" in s]
+        plain = [s for s in resume.skills if ":" not in s]
+        blocks.append("SKILLS\n" + "\n".join(grouped + ([", ".join(plain)] if plain else [])))
+    for name, lines in resume.extra_sections.items():
+        if lines:
+            blocks.append(name.strip().upper() + "\n" + "\n".join(f"- {l}" for l in lines))
+    return "\n\n".join(blocks)
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text or "").strip().lower()
+
+YEAR_RE = re.compile(r"\b(?:19|20)\d{2}\b")
+
+def unfaithful(resume_text: str, resume: ResumeJSON, compact: str) -> str | None:
+    # Why the parse can't stand in for the raw text, or None. The parse must
+    # be a verbatim copy: every fact it holds appears in the raw text, and
+    # every bullet and year of the raw text survives in the rendering.
+    raw, out = _normalize(resume_text), _normalize(compact)
+    facts = resume.header + resume.education + [resume.summary or ""]
+    for e in resume.experience:
+        facts += [e.company or "", e.role or "", e.dates or ""] + e.bullets
+    for lines in resume.extra_sections.values():
+        facts += lines
+    for fact in facts:
+        if _normalize(fact) not in raw:
+            return f"not in resume: {fact[:60]!r}"
+    for line in resume_text.splitlines():
+        if is_bullet(line) and _normalize(line.lstrip().lstrip("•-*").strip()) not in out:
+            return f"dropped: {line.strip()[:60]!r}"
+    missing_years = set(YEAR_RE.findall(resume_text)) - set(YEAR_RE.findall(compact))
+    if missing_years:
+        return f"dropped dates: {sorted(missing_years)}"
+    if "education" in raw and "education" not in out:
+        return "dropped EDUCATION"
+    return None
+
+async def resume_for_prompt(resume_text: str, resume_source: str, provider: str, model: str | None = None) -> str:
+    # "parsed": the cached compact rendering. Falls back to the raw text when
+    # the parse fails for any reason (bad JSON, 429, provider down) or isn't
+    # faithful to the resume. Concurrent jobs tailoring one resume share a
+    # single parse (PARSE_IN_FLIGHT, then PARSE_CACHE).
+    if resume_source != "parsed":
+        return resume_text
+    try:
+        resume = await parse_resume(resume_text, provider, model)
+    except Exception as e:
+        logger.warning("resume parse failed, using raw text: %s", getattr(e, "detail", e))
+        return resume_text
+    compact = render_resume(resume)
+    reason = unfaithful(resume_text, resume, compact)
+    if reason is not None:
+        logger.warning("parsed resume not faithful (%s), using raw text", reason)
+        return resume_text
+    return compact if len(compact) < len(resume_text) else resume_text
+
+# -------------------------
+# Plan: which JD requirements the resume already backs up
+# -------------------------
+def mentions(text: str, term: str) -> bool:
+    term = term.strip().lower()
+    return bool(term) and re.search(r"(?<!\w)" + re.escape(term) + r"(?!\w)", text.lower()) is not None
+
+def build_plan(resume: ResumeJSON, jd: JdJSON, resume_text: str, tolerance: int) -> TailorPlan:
+    mode, allowed, disallowed = policy_for_tolerance(tolerance)
+    bullets = [b for e in resume.experience for b in e.bullets]
+    items, missing = [], []
+    for req in jd.must_have:
+        evidence = [b for b in bullets if mentions(b, req)][:3]
+        if evidence:
+            items.append(PlanItem(jd_requirement=req, evidence=evidence, keywords_to_add=[req], action="keep"))
+        elif mentions(resume_text, req):
+            # named somewhere (skills, summary) but not in any bullet
+            items.append(PlanItem(jd_requirement=req, keywords_to_add=[req], action="rewrite"))
+        else:
+            missing.append(req)
+    return TailorPlan(
+        tolerance=tolerance,
+        mode=mode,
+        allowed=allowed,
+        disallowed=disallowed,
+        missing_must_haves=missing,
+        items=items,
+        global_keywords=[k for k in jd.keywords if mentions(resume_text, k)],
+    )
@@ -54,22 +54,26 @@ MODE RULES:
    - Follow the instructions in the USER PROMPT exactly.
 """
 
-DEFAULT_CUSTOM_TEMPLATE = """MODE: CUSTOM
+# Prompt layout: everything that stays the same across a batch (system prompt,
+# base resume, instructions, mode) comes first and the JD comes last, so jobs
+# 2..N of a batch share a byte-identical prefix that DeepSeek's context cache
+# and Ollama's KV cache can reuse. Don't put per-job values above the JD.
+DEFAULT_CUSTOM_TEMPLATE = """BASE RESUME:
+{RESUME}
+
+MODE: CUSTOM
 ALLOWED:
 {ALLOWED}
 
 DISALLOWED:
 {DISALLOWED}
 
-BASE RESUME:
-{RESUME}
-
-JOB DESCRIPTION:
-{JD}
-
 TASK:
 Rewrite the resume to match the JD. Preserve employers/titles/dates/education. No metrics. No JD copy-paste.
-Output ONLY the resume text."""
+Output ONLY the resume text.
+
+JOB DESCRIPTION:
+{JD}"""
 
 def render_custom_prompt(template: str | None, vars: Dict[str, str]) -> str:
     # Only allow a fixed set of keys
@@ -96,14 +100,9 @@ def build_default_user_prompt(
         resume_text: str,
         jd_text: str,
     ) -> str:
-    return f"""MODE: {mode}
-
-BASE RESUME (source of fixed facts):
+    return f"""BASE RESUME (source of fixed facts):
 {resume_text}
 
-JOB DESCRIPTION (target):
-{jd_text}
-
 TASK:
 Generate a tailored resume that matches the JD according to MODE RULES.
 
@@ -121,5 +120,53 @@ SPECIAL MODE INSTRUCTIONS:
 - If MODE=CREATIVE: add most of key words from JD to resume through bullets and skills section. you can even update job titles. rewrite aggressively to match JD; you may add many JD keywords/skills, but keep it believable; no metrics.
 - If MODE=EVIL: only keep employers/dates/education! You can do whatever to match resume to JD. rewrite all the bullets!
 
+MODE: {mode}
+
+JOB DESCRIPTION (target):
+{jd_text}
+
 Output ONLY the resume text.
 """
+
+# MODE RULES budget some additions across the whole resume ("up to 4 bullets
+# total"); every part is rewritten by its own call, so each gets a share that
+# can't add up past those totals.
+def section_budget(mode: str, section: str) -> str | None:
+    if mode == "conservative":
+        return "Do NOT add bullets or skills."
+    if mode == "balanced":
+        if section == "SKILLS":
+            return "You MAY add at most 2 new generic skills. Do NOT add bullets."
+        return "Do NOT add bullets or new skills to this part."
+    return None
+
+def build_section_user_prompt(
+        mode: str,
+        jd_text: str,
+        section: str,
+        context: str | None,
+        body: str,
+    ) -> str:
+    # One part of the resume for section-parallel tailoring. The part goes
+    # last so the parts of one JD share the instructions + JD prefix.
+    role = f"\nROLE: {context}" if context else ""
+    budget = section_budget(mode, section)
+    budget = f"\nBUDGET FOR THIS PART (replaces any totals in MODE RULES): {budget}" if budget else ""
+    return f"""TASK:
+Rewrite one part of a resume so it matches the JD according to MODE RULES. The other parts are rewritten separately.
+
+OUTPUT REQUIREMENTS:
+- Output ONLY the rewritten lines of this part: no section header, no role/company/dates line, no other sections.
+- Keep the same format: one "- " bullet per line for bullets, plain lines for a paragraph or a skills list.
+- Keep at least as many bullets as the part has.
+- Do NOT copy JD sentences; use your own wording.
+
+MODE: {mode}
+
+JOB DESCRIPTION (target):
+{jd_text}
+
+SECTION: {section}{role}{budget}
+BASE RESUME PART (source of fixed facts):
+{body}
+"""
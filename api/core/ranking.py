@@ -0,0 +1,84 @@
+import math
+import os
+from collections import Counter
+
+from core.keywords import extract_keywords, find_term, technical_terms, terms
+
+# How many of a posting's top keywords count as its must-haves, and how much
+# must-have coverage weighs against overall TF-IDF similarity in the score.
+RANK_MUST_HAVES = int(os.getenv("RANK_MUST_HAVES", "12"))
+RANK_COVERAGE_WEIGHT = float(os.getenv("RANK_COVERAGE_WEIGHT", "0.6"))
+# a missing tool/technology matters more than a missing generic word
+TECHNICAL_WEIGHT = 3.0
+
+# -------------------------
+# TF-IDF over one shared vocabulary
+#
+# Every document (the resume and each posting) becomes a sparse vector
+# {term id: weight}. idf comes from the postings in the request, so terms
+# every posting repeats (company boilerplate) count for little. Similarity
+# against the resume is one pass over an inverted index: postings that share
+# no term with the resume are never touched.
+# -------------------------
+def _tf(vocab: dict[str, int], text: str) -> dict[int, float]:
+    # sublinear term frequency; new terms get the next id
+    return {vocab.setdefault(t, len(vocab)): 1 + math.log(n) for t, n in Counter(terms(text)).items()}
+
+def _tfidf(tf: dict[int, float], idf: list[float]) -> dict[int, float]:
+    vec = {t: w * idf[t] for t, w in tf.items()}
+    norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+    return {t: w / norm for t, w in vec.items()}
+
+def similarities(resume_text: str, jd_texts: list[str]) -> tuple[dict[str, int], list[dict[int, float]], list[float], set[int]]:
+    # -> (vocabulary, posting vectors, cosine similarity per posting, resume term ids)
+    vocab: dict[str, int] = {}
+    jd_tfs = [_tf(vocab, t) for t in jd_texts]
+    resume_tf = _tf(vocab, resume_text)
+
+    df = [0] * len(vocab)
+    for tf in jd_tfs:
+        for t in tf:
+            df[t] += 1
+    n = len(jd_tfs)
+    idf = [math.log((1 + n) / (1 + d)) + 1 for d in df]
+
+    jd_vecs = [_tfidf(tf, idf) for tf in jd_tfs]
+    resume_vec = _tfidf(resume_tf, idf)
+
+    # inverted index, restricted to the resume's terms: term -> [(posting, weight)]
+    postings: dict[int, list[tuple[int, float]]] = {t: [] for t in resume_vec}
+    for i, vec in enumerate(jd_vecs):
+        for t, w in vec.items():
+            if t in postings:
+                postings[t].append((i, w))
+
+    scores = [0.0] * n
+    for t, rw in resume_vec.items():
+        for i, w in postings[t]:
+            scores[i] += rw * w
+    return vocab, jd_vecs, scores, set(resume_tf)
+
+def rank(resume_text: str, jd_texts: list[str]) -> list[dict]:
+    # one dict per posting, in input order: score (0..1), similarity,
+    # coverage and the must-haves the resume does / doesn't mention
+    vocab, jd_vecs, sims, resume_terms = similarities(resume_text, jd_texts)
+    out = []
+    for text, vec, sim in zip(jd_texts, jd_vecs, sims):
+        # must-haves: the posting's keywords, tools/technologies first, then
+        # by TF-IDF weight
+        technical = technical_terms(text)
+        candidates = extract_keywords(text)
+        must = sorted(candidates, key=lambda k: (k not in technical, -vec.get(vocab.get(k, -1), 0.0)))[:RANK_MUST_HAVES]
+        matched = [k for k in must if vocab.get(k) in resume_terms]
+        missing = [k for k in must if vocab.get(k) not in resume_terms]
+        weight = {k: vec.get(vocab[k], 0.0) * (TECHNICAL_WEIGHT if k in technical else 1) for k in must}
+        total = sum(weight.values())
+        coverage = sum(weight[k] for k in matched) / total if total else 0.0
+        out.append({
+            "score": RANK_COVERAGE_WEIGHT * coverage + (1 - RANK_COVERAGE_WEIGHT) * sim,
+            "similarity": sim,
+            "coverage": coverage,
+            "matched": [find_term(text, k) or k for k in matched],
+            "missing": [find_term(text, k) or k for k in missing],
+        })
+    return out
@@ -0,0 +1,48 @@
+from services.pdf import SECTION_HEADERS
+
+# Fixed facts: passed through untouched by section-parallel tailoring.
+FIXED_SECTIONS = {"EDUCATION", "CERTIFICATIONS", "AWARDS"}
+
+def is_section_header(line: str) -> bool:
+    s = line.strip()
+    return s.isupper() and s in SECTION_HEADERS
+
+def is_bullet(line: str) -> bool:
+    s = line.lstrip()
+    return s.startswith("•") or s.startswith("-") or s.startswith("*")
+
+def split_sections(text: str) -> list[tuple[str | None, list[str]]]:
+    # [(None, header lines), ("SUMMARY", lines), ("EXPERIENCE", lines), ...]
+    # in resume order; blank lines at the edges of a section are dropped
+    sections: list[tuple[str | None, list[str]]] = [(None, [])]
+    for line in text.splitlines():
+        if is_section_header(line):
+            sections.append((line.strip(), []))
+        else:
+            sections[-1][1].append(line.rstrip())
+    out = []
+    for name, lines in sections:
+        while lines and not lines[0].strip():
+            lines.pop(0)
+        while lines and not lines[-1].strip():
+            lines.pop()
+        if name is not None or lines:
+            out.append((name, lines))
+    return out
+
+def split_roles(lines: list[str]) -> list[tuple[list[str], list[str]]]:
+    # EXPERIENCE body -> [(role header lines, bullet lines)]; a role starts at
+    # the first non-bullet line after a bullet
+    roles: list[tuple[list[str], list[str]]] = []
+    for line in lines:
+        if not line.strip():
+            continue
+        if is_bullet(line):
+            if not roles:
+                roles.append(([], []))
+            roles[-1][1].append(line)
+        else:
+            if not roles or roles[-1][1]:
+                roles.append(([], []))
+            roles[-1][0].append(line)
+    return roles
@@ -1,20 +1,36 @@
-from core.prompting import DEFAULT_SYSTEM_PROMPT, build_default_user_prompt, render_custom_prompt
+import asyncio
+from typing import AsyncIterator
+
+from core.prompting import (
+    DEFAULT_SYSTEM_PROMPT,
+    build_default_user_prompt,
+    build_section_user_prompt,
+    render_custom_prompt,
+    section_budget,
+)
 from fastapi import HTTPException
+from core.local_tailor import resolve_engine, tailor_local
+from core.parsing import resume_for_prompt
 from core.policy import policy_for_tolerance
-from services.llm import llm_chat
+from core.sections import FIXED_SECTIONS, is_bullet, split_roles, split_sections
+from services import metrics
+from services.llm import llm_chat, llm_chat_stream
+
+EDUCATION_REMOVED = "Tailored output removed EDUCATION section. Regenerate."
 
 def contains_education(text: str) -> bool:
     return "education" in (text or "").lower()
 
-def tailor_text(
+def education_preserved(resume_text: str, content: str) -> bool:
+    return not (contains_education(resume_text) and not contains_education(content))
+
+def build_tailor_prompt(
         resume_text: str,
         jd_text: str,
         tolerance: int,
-        provider: str,
-        model: str | None = None,
         prompt_mode: str = "default",
-        custom_prompt: str | None = None
-    ) -> str:
+        custom_prompt: str | None = None,
+    ) -> tuple[str, str, float]:
     mode, allowed, disallowed = policy_for_tolerance(tolerance)
     vars = {
         "MODE": mode,
@@ -29,18 +45,151 @@ def tailor_text(
         user = render_custom_prompt(custom_prompt, vars)
     else:
         user = build_default_user_prompt(mode, resume_text, jd_text)
+    return system, user, temperature_for(mode)
+
+def temperature_for(mode: str) -> float:
     if mode == "evil":
-        temp = 0.5
-    elif mode == "creative":
-        temp = 0.3
-    elif mode == "conservative":
-        temp = 0.1
-    else:
-        temp = 0.0
+        return 0.5
+    if mode == "creative":
+        return 0.3
+    if mode == "conservative":
+        return 0.1
+    return 0.0
+
+# -------------------------
+# Section-parallel tailoring
+#
+# The resume is split at SECTION_HEADERS and EXPERIENCE into roles; every
+# part is rewritten by its own concurrent LLM call with the same JD, so
+# latency follows the largest part instead of the whole resume. Headers,
+# role lines and fixed-fact sections (EDUCATION, ...) are kept verbatim.
+# -------------------------
+def sections_supported(resume_text: str, prompt_mode: str) -> bool:
+    # custom prompts are written for the whole resume
+    return prompt_mode != "custom" and any(name for name, _ in split_sections(resume_text))
+
+def _clean_part(output: str, echoed: list[str]) -> str:
+    lines = [l.rstrip() for l in output.strip().splitlines()]
+    # models sometimes repeat the header or role line they were told to leave out
+    while lines and (not lines[0].strip() or lines[0].strip() in echoed):
+        lines.pop(0)
+    return "\n".join(lines)
+
+def _cap_bullets(text: str, limit: int) -> str:
+    # drops bullets past `limit`, for modes that may not add any
+    out, seen = [], 0
+    for line in text.splitlines():
+        if is_bullet(line):
+            seen += 1
+            if seen > limit:
+                continue
+        out.append(line)
+    return "\n".join(out)
+
+async def _tailor_sections(
+        resume_text: str,
+        jd_text: str,
+        tolerance: int,
+        provider: str,
+        model: str | None,
+        cache_mode: str,
+    ) -> AsyncIterator[str]:
+    # Yields the tailored resume one section at a time, in order; all LLM
+    # calls are started up front.
+    mode, _, _ = policy_for_tolerance(tolerance)
+    temp = temperature_for(mode)
+    tasks: list[asyncio.Task] = []
+
+    async def rewrite(section: str, head: list[str], body: list[str]) -> str:
+        user = build_section_user_prompt(mode, jd_text, section, " ".join(l.strip() for l in head) or None, "\n".join(body))
+        out = await llm_chat(provider, DEFAULT_SYSTEM_PROMPT, user, temperature=temp, model=model, cache_mode=cache_mode)
+        out = _clean_part(out, [section] + [l.strip() for l in head])
+        if section_budget(mode, section) is not None:
+            out = _cap_bullets(out, sum(is_bullet(l) for l in body))
+        return out or "\n".join(body)
+
+    def spawn(section: str, head: list[str], body: list[str]) -> asyncio.Task:
+        task = asyncio.ensure_future(rewrite(section, head, body))
+        tasks.append(task)
+        return task
 
-    content = llm_chat(provider, system, user, temperature=temp, model=model).strip()
+    # each block: lines and pending parts, joined with newlines
+    blocks: list[list[str | asyncio.Task]] = []
+    for name, lines in split_sections(resume_text):
+        if name is None or name in FIXED_SECTIONS or not any(l.strip() for l in lines):
+            blocks.append(([name] if name else []) + lines)
+        elif name == "EXPERIENCE":
+            block: list[str | asyncio.Task] = [name]
+            for i, (head, bullets) in enumerate(split_roles(lines)):
+                block += ([""] if i else []) + head
+                if bullets:
+                    block.append(spawn(name, head, bullets))
+            blocks.append(block)
+        else:
+            blocks.append([name, spawn(name, [], lines)])
 
-    if contains_education(resume_text) and not contains_education(content):
-        raise HTTPException(status_code=400, detail="Tailored output removed EDUCATION section. Regenerate.")
+    try:
+        for i, block in enumerate(blocks):
+            parts = [p if isinstance(p, str) else await p for p in block]
+            yield ("\n\n" if i else "") + "\n".join(parts)
+    finally:
+        for t in tasks:
+            t.cancel()
+
+async def tailor_text(
+        resume_text: str,
+        jd_text: str,
+        tolerance: int,
+        provider: str,
+        model: str | None = None,
+        prompt_mode: str = "default",
+        custom_prompt: str | None = None,
+        cache_mode: str = "default",
+        resume_source: str = "raw",
+        tailor_strategy: str = "single",
+        engine: str = "llm",
+    ) -> str:
+    if resolve_engine(engine, tolerance) == "local":
+        return tailor_local(resume_text, jd_text)
+
+    prompt_resume = await resume_for_prompt(resume_text, resume_source, provider, model)
+    if tailor_strategy == "sections" and sections_supported(prompt_resume, prompt_mode):
+        blocks = _tailor_sections(prompt_resume, jd_text, tolerance, provider, model, cache_mode)
+        content = "".join([b async for b in blocks]).strip()
+    else:
+        system, user, temp = build_tailor_prompt(prompt_resume, jd_text, tolerance, prompt_mode, custom_prompt)
+        content = (await llm_chat(provider, system, user, temperature=temp, model=model, cache_mode=cache_mode)).strip()
+
+    if not education_preserved(resume_text, content):
+        metrics.EDUCATION_REMOVED_TOTAL.labels(provider).inc()
+        raise HTTPException(status_code=400, detail=EDUCATION_REMOVED)
 
     return content
+
+async def tailor_text_stream(
+        resume_text: str,
+        jd_text: str,
+        tolerance: int,
+        provider: str,
+        model: str | None = None,
+        prompt_mode: str = "default",
+        custom_prompt: str | None = None,
+        cache_mode: str = "default",
+        resume_source: str = "raw",
+        tailor_strategy: str = "single",
+        engine: str = "llm",
+    ) -> AsyncIterator[str]:
+    # Raw token stream; the caller runs education_preserved() on the joined text.
+    # With tailor_strategy="sections" the deltas are whole sections, in order;
+    # the local engine sends the whole resume as one delta.
+    if resolve_engine(engine, tolerance) == "local":
+        yield tailor_local(resume_text, jd_text)
+        return
+    prompt_resume = await resume_for_prompt(resume_text, resume_source, provider, model)
+    if tailor_strategy == "sections" and sections_supported(prompt_resume, prompt_mode):
+        async for block in _tailor_sections(prompt_resume, jd_text, tolerance, provider, model, cache_mode):
+            yield block
+        return
+    system, user, temp = build_tailor_prompt(prompt_resume, jd_text, tolerance, prompt_mode, custom_prompt)
+    async for delta in llm_chat_stream(provider, system, user, temperature=temp, model=model, cache_mode=cache_mode):
+        yield delta
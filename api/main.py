@@ -1,11 +1,28 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 
 from routes import router as api_router
+from services import jd_extract, llm, metrics, pdf
+from services.jobs import JOBS
 
 WEB_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000", "http://192.168.128.153:3000"]
 
-app = FastAPI(title="AI Resume Tailor API", version="0.2")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # load Ollama models up front so the first request doesn't pay for it
+    await llm.start()
+    await JOBS.start()
+    yield
+    await JOBS.stop()
+    # release pooled keep-alive connections
+    await llm.aclose()
+    await jd_extract.aclose()
+    pdf.shutdown()
+
+app = FastAPI(title="AI Resume Tailor API", version="0.2", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,4 +32,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    # for streamed responses this is time to first byte, not the whole body
+    t0 = time.perf_counter()
+    with metrics.IN_FLIGHT.labels("http").track_inprogress():
+        response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.HTTP_REQUEST_SECONDS.labels(
+        request.method, getattr(route, "path", "unmatched"), str(response.status_code)
+    ).observe(time.perf_counter() - t0)
+    return response
+
 app.include_router(api_router)
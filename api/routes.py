@@ -1,30 +1,92 @@
+import asyncio
+import json
+
 from fastapi import APIRouter, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from schemas import (
+    ParseRequest,
+    ParseResponse,
     TailorRequest,
     TailorResponse,
     ExtractJdRequest,
     ExtractJdResponse,
+    ExtractJdBulkRequest,
+    ExtractJdBulkItem,
+    ExtractJdBulkResponse,
     PdfRequest,
+    RankRequest,
+    RankItem,
+    RankResponse,
     BatchZipRequest,
+    BatchJobRequest,
+    BatchJobItem,
+    BatchJobResponse,
 )
 
-from core.tailor import tailor_text
-from services.jd_extract import fetch_jd_text
-from services.pdf import render_resume_pdf
-from services.batch import build_zip
+from core.parsing import build_plan, parse_jd, parse_resume
+from core.ranking import rank
+from core.tailor import EDUCATION_REMOVED, education_preserved, tailor_text, tailor_text_stream
+from services import metrics
+from services.jd_extract import fetch_jd_text, fetch_jd_texts
+from services.pdf import render_pdf_bytes
+from services.batch import iter_zip
+from services.jobs import JOBS, artifact_path, iter_job_zip
+from services.llm import ADMISSION, BREAKERS, OLLAMA_POOL, USAGE
 
 router = APIRouter()
 
 @router.get("/health")
-def health():
+async def health():
     return {"ok": True}
 
+@router.get("/metrics")
+async def prometheus_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@router.get("/llm/usage")
+async def llm_usage():
+    # cumulative token counts per provider:model since startup; cached_prompt_tokens
+    # is DeepSeek's prompt_cache_hit_tokens
+    return USAGE
+
+@router.get("/models")
+async def models():
+    # Ollama model residency per backend: state (unloaded/loading/loaded/error),
+    # last load time and duration, last successful use
+    return OLLAMA_POOL.models_snapshot()
+
+@router.get("/llm/admission")
+async def llm_admission():
+    # per-provider slots in use, queued callers, admitted/rejected counts and
+    # circuit breaker state
+    return {p: {**a.snapshot(), "breaker": BREAKERS[p].snapshot()} for p, a in ADMISSION.items()}
+
+@router.get("/llm/backends")
+async def llm_backends():
+    # Ollama pool: health, outstanding requests, failures per backend
+    return OLLAMA_POOL.snapshot()
+
+@router.post("/parse", response_model=ParseResponse)
+async def parse(req: ParseRequest):
+    # both parses are cached by content hash, so re-sending the same resume is free
+    try:
+        resume_json, jd_json = await asyncio.gather(
+            parse_resume(req.resume_text, req.provider, req.model),
+            parse_jd(req.jd_text, req.provider, req.model),
+        )
+        plan = build_plan(resume_json, jd_json, req.resume_text, req.tolerance)
+        return ParseResponse(resume_json=resume_json, jd_json=jd_json, plan=plan)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/tailor", response_model=TailorResponse)
-def tailor(req: TailorRequest):
+async def tailor(req: TailorRequest):
     try:
-        out = tailor_text(
+        out = await tailor_text(
             req.resume_text,
             req.jd_text,
             req.tolerance,
@@ -32,6 +94,10 @@ def tailor(req: TailorRequest):
             model=req.model,
             prompt_mode=req.prompt_mode,
             custom_prompt=req.custom_prompt,
+            cache_mode=req.cache_mode,
+            resume_source=req.resume_source,
+            tailor_strategy=req.tailor_strategy,
+            engine=req.engine,
         )
         return TailorResponse(tailored_resume=out)
     except HTTPException:
@@ -39,27 +105,108 @@ def tailor(req: TailorRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/tailor/stream")
+async def tailor_stream(req: TailorRequest):
+    # Server-Sent Events: "token" events carry text deltas, then exactly one
+    # "done" (with the EDUCATION check result) or "error" event ends the stream.
+    async def events():
+        parts: list[str] = []
+        try:
+            async for delta in tailor_text_stream(
+                req.resume_text,
+                req.jd_text,
+                req.tolerance,
+                req.provider,
+                model=req.model,
+                prompt_mode=req.prompt_mode,
+                custom_prompt=req.custom_prompt,
+                cache_mode=req.cache_mode,
+                resume_source=req.resume_source,
+                tailor_strategy=req.tailor_strategy,
+                engine=req.engine,
+            ):
+                parts.append(delta)
+                yield _sse("token", {"text": delta})
+        except HTTPException as e:
+            retry_after = (e.headers or {}).get("Retry-After")
+            yield _sse("error", {"status": e.status_code, "detail": e.detail, "retry_after": retry_after})
+            return
+        except Exception as e:
+            yield _sse("error", {"status": 500, "detail": str(e)})
+            return
+
+        content = "".join(parts).strip()
+        preserved = education_preserved(req.resume_text, content)
+        if not preserved:
+            metrics.EDUCATION_REMOVED_TOTAL.labels(req.provider).inc()
+        yield _sse("done", {
+            "ok": preserved,
+            "education_preserved": preserved,
+            "detail": None if preserved else EDUCATION_REMOVED,
+            "tailored_resume": content,
+        })
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+
 @router.post("/extract_jd", response_model=ExtractJdResponse)
-def extract_jd(req: ExtractJdRequest):
+async def extract_jd(req: ExtractJdRequest):
     try:
-        return ExtractJdResponse(jd_text=fetch_jd_text(req.url))
+        return ExtractJdResponse(jd_text=await fetch_jd_text(req.url))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@router.post("/extract_jd_bulk", response_model=ExtractJdBulkResponse)
+async def extract_jd_bulk(req: ExtractJdBulkRequest):
+    texts = await fetch_jd_texts(req.urls)
+    results = [
+        ExtractJdBulkItem(url=url, error=str(t)) if isinstance(t, BaseException) else ExtractJdBulkItem(url=url, jd_text=t)
+        for url, t in zip(req.urls, texts)
+    ]
+    return ExtractJdBulkResponse(results=results)
+
+@router.post("/rank", response_model=RankResponse)
+async def rank_postings(req: RankRequest):
+    # Cheap relevance ranking of many postings against one resume, no LLM:
+    # decide which ones are worth tailoring.
+    if not req.jd_texts and not req.job_urls:
+        raise HTTPException(status_code=400, detail="Send jd_texts and/or job_urls")
+    fetched = await fetch_jd_texts(req.job_urls) if req.job_urls else []
+    sources = [(None, t) for t in req.jd_texts] + list(zip(req.job_urls, fetched))
+
+    ok = [(i, url, t) for i, (url, t) in enumerate(sources, start=1) if not isinstance(t, BaseException)]
+    # pure-Python scoring of thousands of postings: keep it off the event loop
+    scored = await asyncio.to_thread(rank, req.resume_text, [t for _, _, t in ok])
+    results = [
+        RankItem(index=i, url=url, **{k: round(v, 4) if isinstance(v, float) else v for k, v in s.items()})
+        for (i, url, _), s in zip(ok, scored)
+    ]
+    results.sort(key=lambda r: -r.score)
+    if req.top_k is not None:
+        results = results[:req.top_k]
+    results += [
+        RankItem(index=i, url=url, error=str(t))
+        for i, (url, t) in enumerate(sources, start=1) if isinstance(t, BaseException)
+    ]
+    return RankResponse(results=results)
+
 @router.post("/resume_pdf")
-def resume_pdf(req: PdfRequest):
+async def resume_pdf(req: PdfRequest):
     try:
-        pdf_buf = render_resume_pdf(req.resume_text)
+        pdf = await render_pdf_bytes(req.resume_text)
         filename = (req.filename or "tailored_resume.pdf").replace("\n", "").replace("\r", "")
         headers = {"Content-Disposition": f'attachment; filename="{filename}"'}
-        return StreamingResponse(pdf_buf, media_type="application/pdf", headers=headers)
+        return Response(pdf, media_type="application/pdf", headers=headers)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/batch_zip")
-def batch_zip(req: BatchZipRequest):
+async def batch_zip(req: BatchZipRequest):
     try:
-        zip_buf = build_zip(
+        zip_stream = iter_zip(
             base_resume_text=req.base_resume_text,
             job_urls=req.job_urls,
             tolerance=req.tolerance,
@@ -68,10 +215,64 @@ def batch_zip(req: BatchZipRequest):
             model=req.model,
             prompt_mode=req.prompt_mode,
             custom_prompt=req.custom_prompt,
+            cache_mode=req.cache_mode,
+            resume_source=req.resume_source,
+            tailor_strategy=req.tailor_strategy,
+            engine=req.engine,
         )
         headers = {"Content-Disposition": 'attachment; filename="tailored_resumes.zip"'}
-        return StreamingResponse(zip_buf, media_type="application/zip", headers=headers)
+        return StreamingResponse(zip_stream, media_type="application/zip", headers=headers)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+# -------------------------
+# Queued batch jobs
+# -------------------------
+async def _job_or_404(job_id: str) -> dict:
+    job = await asyncio.to_thread(JOBS.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+def _job_response(job: dict) -> BatchJobResponse:
+    items = [BatchJobItem(index=i["idx"], url=i["url"], status=i["status"], error=i["error"]) for i in job["items"]]
+    return BatchJobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        total=job["total"],
+        completed=sum(i.status == "done" for i in items),
+        failed=sum(i.status == "error" for i in items),
+        created_at=job["created"],
+        updated_at=job["updated"],
+        finished_at=job["finished"],
+        items=items,
+    )
+
+@router.post("/jobs", response_model=BatchJobResponse, status_code=202)
+async def create_job(req: BatchJobRequest):
+    job_id = await JOBS.submit(req.model_dump())
+    return _job_response(await _job_or_404(job_id))
+
+@router.get("/jobs/{job_id}", response_model=BatchJobResponse)
+async def get_job(job_id: str):
+    return _job_response(await _job_or_404(job_id))
+
+@router.get("/jobs/{job_id}/zip")
+async def get_job_zip(job_id: str):
+    job = await _job_or_404(job_id)
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+    headers = {"Content-Disposition": 'attachment; filename="tailored_resumes.zip"'}
+    return StreamingResponse(iter_job_zip(JOBS.store, job), media_type="application/zip", headers=headers)
+
+@router.get("/jobs/{job_id}/items/{index}.{ext}")
+async def get_job_item(job_id: str, index: int, ext: str):
+    if ext not in ("pdf", "txt"):
+        raise HTTPException(status_code=404, detail="Unknown artifact type")
+    path = artifact_path(JOBS.store, await _job_or_404(job_id), index, ext)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Item not finished")
+    media_type = "application/pdf" if ext == "pdf" else "text/plain; charset=utf-8"
+    return FileResponse(path, media_type=media_type, filename=path.name)
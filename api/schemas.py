@@ -1,4 +1,4 @@
-from typing import List, Optional, Literal, Tuple
+from typing import Dict, List, Optional, Literal, Tuple
 
 from pydantic import BaseModel, Field
 
@@ -10,6 +10,8 @@ class ParseRequest(BaseModel):
     resume_text: str = Field(min_length=50)
     jd_text: str = Field(min_length=50)
     tolerance: int = Field(ge=0, le=100)
+    provider: Literal["ollama", "deepseek"] = "ollama"
+    model: Optional[str] = None
 
 class ResumeExperience(BaseModel):
     company: Optional[str] = None
@@ -18,10 +20,12 @@ class ResumeExperience(BaseModel):
     bullets: List[str] = Field(default_factory=list)
 
 class ResumeJSON(BaseModel):
+    header: List[str] = Field(default_factory=list)  # name / contact lines
     summary: Optional[str] = None
     skills: List[str] = Field(default_factory=list)
     experience: List[ResumeExperience] = Field(default_factory=list)
     education: List[str] = Field(default_factory=list)
+    extra_sections: Dict[str, List[str]] = Field(default_factory=dict)  # PROJECTS, CERTIFICATIONS, ...
 
 class JdJSON(BaseModel):
     title: Optional[str] = None
@@ -30,10 +34,6 @@ class JdJSON(BaseModel):
     responsibilities: List[str] = Field(default_factory=list)
     keywords: List[str] = Field(default_factory=list)
 
-class ParseResponse(BaseModel):
-    resume_json: ResumeJSON
-    jd_json: JdJSON
-
 class PlanItem(BaseModel):
     jd_requirement: str
     evidence: List[str] = Field(default_factory=list)  # short snippets from resume
@@ -49,17 +49,41 @@ class TailorPlan(BaseModel):
     items: List[PlanItem] = Field(default_factory=list)
     global_keywords: List[str] = Field(default_factory=list)  # MUST already exist in resume text
 
-class TailorRequest(BaseModel):
-    resume_text: str = Field(min_length=50)
-    jd_text: str = Field(min_length=50)
-    tolerance: int = Field(ge=0, le=100)
+class ParseResponse(BaseModel):
+    resume_json: ResumeJSON
+    jd_json: JdJSON
     plan: Optional[TailorPlan] = None
+
+class TailorOptions(BaseModel):
+    # how to tailor; shared by single and batch requests
+    tolerance: int = Field(ge=0, le=100)
     provider: Literal["ollama", "deepseek"] = "ollama"
     model: Optional[str] = None
 
     prompt_mode: Literal["default", "custom"] = "default"
     custom_prompt: Optional[str] = None
 
+    # "default": reuse cached LLM output for temperature-0 calls; "bypass": always call the model;
+    # "force": cache even when sampling with temperature > 0
+    cache_mode: Literal["default", "bypass", "force"] = "default"
+
+    # "raw": the resume text as sent; "parsed": a compact rendering of the
+    # parsed resume (parsed once per distinct resume, then cached)
+    resume_source: Literal["raw", "parsed"] = "raw"
+
+    # "single": one LLM call for the whole resume; "sections": one concurrent
+    # call per section / EXPERIENCE role, EDUCATION etc. passed through as is
+    tailor_strategy: Literal["single", "sections"] = "single"
+
+    # "llm"; "local": deterministic keyword-based reordering without an LLM
+    # call (tolerance < 30 only); "auto": local when tolerance < 30
+    engine: Literal["llm", "local", "auto"] = "llm"
+
+class TailorRequest(TailorOptions):
+    resume_text: str = Field(min_length=50)
+    jd_text: str = Field(min_length=50)
+    plan: Optional[TailorPlan] = None
+
 class TailorResponse(BaseModel):
     tailored_resume: str
 
@@ -69,17 +93,68 @@ class ExtractJdRequest(BaseModel):
 class ExtractJdResponse(BaseModel):
     jd_text: str
 
+class ExtractJdBulkRequest(BaseModel):
+    urls: List[str] = Field(min_items=1, max_items=200)
+
+class ExtractJdBulkItem(BaseModel):
+    url: str
+    jd_text: Optional[str] = None
+    error: Optional[str] = None
+
+class ExtractJdBulkResponse(BaseModel):
+    results: List[ExtractJdBulkItem]
+
 class PdfRequest(BaseModel):
     resume_text: str = Field(min_length=50)
     filename: Optional[str] = "tailored_resume.pdf"
 
-class BatchZipRequest(BaseModel):
+class BatchZipRequest(TailorOptions):
     base_resume_text: str = Field(min_length=50)
     job_urls: List[str] = Field(min_items=1, max_items=10)
-    tolerance: int = Field(ge=0, le=100)
     format: Literal["pdf", "pdf+txt"] = "pdf"
-    provider: Literal["ollama", "deepseek"] = "ollama"
-    model: Optional[str] = None
 
-    prompt_mode: Literal["default", "custom"] = "default"
-    custom_prompt: Optional[str] = None
+class BatchJobRequest(BatchZipRequest):
+    # queued jobs aren't tied to one HTTP request, so they can be much larger
+    job_urls: List[str] = Field(min_items=1, max_items=500)
+
+class BatchJobItem(BaseModel):
+    index: int
+    url: str
+    # queued -> fetching -> tailoring -> rendering -> done | error
+    status: str
+    error: Optional[str] = None
+
+class BatchJobResponse(BaseModel):
+    job_id: str
+    # queued | running | done
+    status: str
+    total: int
+    completed: int = 0
+    failed: int = 0
+    created_at: float
+    updated_at: float
+    finished_at: Optional[float] = None
+    items: List[BatchJobItem] = Field(default_factory=list)
+
+class RankRequest(BaseModel):
+    resume_text: str = Field(min_length=50)
+    # postings as text and/or URLs (fetched like /extract_jd_bulk); at least one
+    jd_texts: List[str] = Field(default_factory=list, max_items=5000)
+    job_urls: List[str] = Field(default_factory=list, max_items=2000)
+    top_k: Optional[int] = Field(default=None, ge=1)
+
+class RankItem(BaseModel):
+    # 1-based position over jd_texts, then job_urls
+    index: int
+    url: Optional[str] = None
+    # coverage-weighted blend of must-have coverage and TF-IDF similarity, 0..1
+    score: float = 0.0
+    similarity: float = 0.0
+    coverage: float = 0.0
+    matched: List[str] = Field(default_factory=list)
+    missing: List[str] = Field(default_factory=list)
+    error: Optional[str] = None
+
+class RankResponse(BaseModel):
+    # best first; postings that couldn't be fetched come last
+    results: List[RankItem]
@@ -0,0 +1,136 @@
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import HTTPException
+
+from services import metrics
+
+# -------------------------
+# Per-provider admission control
+#
+# A call first takes a token from the provider's bucket (requests/second with
+# a burst), then one of its concurrency slots. Callers wait for either only
+# while the wait queue has room and the expected wait fits in max_wait; past
+# that they get a 429 with Retry-After right away instead of piling up until
+# the provider times them out.
+# -------------------------
+def saturated(provider: str, reason: str, retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail=f"{provider} is saturated ({reason}), retry later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        # takes a token now (possibly going into debt) and returns how long
+        # the caller has to wait before using it
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def refund(self):
+        self.tokens += 1
+
+class Admission:
+    def __init__(
+        self,
+        provider: str,
+        max_concurrency: int,
+        rate_per_second: float = 0,
+        burst: int = 1,
+        max_queue: int = 0,
+        max_wait_seconds: float = 10,
+    ):
+        self.provider = provider
+        self.max_concurrency = max(1, max_concurrency)
+        self.bucket = TokenBucket(rate_per_second, burst) if rate_per_second > 0 else None
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        # moving average of how long a call holds its slot; drives Retry-After
+        self.avg_hold_seconds = 1.0
+
+    def _queue_retry_after(self) -> float:
+        return self.avg_hold_seconds * (self.waiting + 1) / self.max_concurrency
+
+    def _reject(self, reason: str, retry_after: float) -> HTTPException:
+        self.rejected += 1
+        metrics.LLM_REJECTED.labels(self.provider, reason).inc()
+        return saturated(self.provider, reason, retry_after)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        deadline = time.monotonic() + self.max_wait_seconds
+
+        if self.bucket is not None:
+            wait = self.bucket.reserve()
+            if wait > self.max_wait_seconds:
+                self.bucket.refund()
+                raise self._reject("rate limit", wait)
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+        if self._slots.locked():
+            if self.waiting >= self.max_queue:
+                raise self._reject("queue full", self._queue_retry_after())
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                # not the builtin TimeoutError before Python 3.11
+                raise self._reject("wait timeout", self._queue_retry_after())
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+
+        self.active += 1
+        self.admitted += 1
+        t0 = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._slots.release()
+            self.avg_hold_seconds = 0.8 * self.avg_hold_seconds + 0.2 * (time.monotonic() - t0)
+
+    def snapshot(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "avg_hold_seconds": round(self.avg_hold_seconds, 3),
+        }
+
+def admission_from_env(provider: str, concurrency: int, queue: int, max_wait_seconds: float) -> Admission:
+    # LLM_<PROVIDER>_MAX_CONCURRENCY, _RATE_PER_SECOND (0 = no rate limit),
+    # _BURST, _MAX_QUEUE, _MAX_WAIT_SECONDS
+    prefix = f"LLM_{provider.upper()}_"
+    return Admission(
+        provider,
+        max_concurrency=int(os.getenv(prefix + "MAX_CONCURRENCY", str(concurrency))),
+        rate_per_second=float(os.getenv(prefix + "RATE_PER_SECOND", "0")),
+        burst=int(os.getenv(prefix + "BURST", "5")),
+        max_queue=int(os.getenv(prefix + "MAX_QUEUE", str(queue))),
+        max_wait_seconds=float(os.getenv(prefix + "MAX_WAIT_SECONDS", str(max_wait_seconds))),
+    )
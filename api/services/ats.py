@@ -0,0 +1,212 @@
+import html
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# -------------------------
+# ATS adapter registry
+#
+# Each adapter knows how to turn a posting URL on its hostname into that ATS's
+# public JSON endpoint, and how to pull the description fragments (HTML or
+# plain text) out of the JSON payload. Adapters do no I/O themselves, so they
+# can be exercised offline against recorded payloads (bench/fixtures/ats).
+#
+# Adapters for ATSs with a board-wide listing endpoint also describe it, so a
+# batch with several postings from one board can fetch the board once.
+# -------------------------
+class AtsAdapter:
+    def __init__(
+        self,
+        name: str,
+        hosts: Tuple[str, ...],
+        match: Callable[[str, Dict[str, List[str]], str], Optional[Dict[str, str]]],
+        api_url: Callable[[Dict[str, str]], str],
+        extract: Callable[[dict, Dict[str, str]], List[str]],
+        board_url: Optional[Callable[[Dict[str, str]], str]] = None,
+        board_postings: Optional[Callable[[object], Dict[str, dict]]] = None,
+        posting_id: Optional[Callable[[Dict[str, str]], str]] = None,
+    ):
+        self.name = name
+        self.hosts = hosts
+        self.match = match  # (path, query, host) -> ids or None
+        self.api_url = api_url  # ids -> JSON endpoint
+        self.extract = extract  # (payload, ids) -> description fragments
+        self.board_url = board_url  # ids -> listing endpoint with full content
+        self.board_postings = board_postings  # listing payload -> {posting id: payload for extract}
+        self.posting_id = posting_id  # ids -> key into board_postings
+
+ADAPTERS_BY_HOST: Dict[str, AtsAdapter] = {}
+# "*.recruitee.com" style registrations, keyed by the parent domain
+ADAPTERS_BY_PARENT: Dict[str, AtsAdapter] = {}
+
+def register(adapter: AtsAdapter) -> AtsAdapter:
+    for host in adapter.hosts:
+        if host.startswith("*."):
+            ADAPTERS_BY_PARENT[host[2:]] = adapter
+        else:
+            ADAPTERS_BY_HOST[host] = adapter
+    return adapter
+
+def adapter_for_host(host: str) -> Optional[AtsAdapter]:
+    host = host.lower()
+    adapter = ADAPTERS_BY_HOST.get(host)
+    if adapter is None and "." in host:
+        adapter = ADAPTERS_BY_PARENT.get(host.split(".", 1)[1])
+    return adapter
+
+def resolve(url: str) -> Optional[Tuple[AtsAdapter, Dict[str, str]]]:
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    adapter = adapter_for_host(host)
+    if adapter is None:
+        return None
+    ids = adapter.match(parts.path, parse_qs(parts.query), host)
+    if ids is None:
+        return None
+    return adapter, ids
+
+def _unescape(fragment: str) -> str:
+    # some APIs (Greenhouse) return entity-escaped HTML
+    return html.unescape(fragment) if "&lt;" in fragment else fragment
+
+def _fields(obj: dict, *names: str) -> List[str]:
+    return [_unescape(obj[n]) for n in names if isinstance(obj.get(n), str) and obj[n].strip()]
+
+# -------------------------
+# Greenhouse
+#  - https://boards.greenhouse.io/<board>/jobs/<id>
+#  - https://job-boards.greenhouse.io/<board>/jobs/<id>
+#  - https://boards.greenhouse.io/<board>?gh_jid=<id>
+# API: https://boards-api.greenhouse.io/v1/boards/<board>/jobs/<id>
+# -------------------------
+def _greenhouse_match(path, query, host):
+    m = re.match(r"/([^/]+)/jobs/(\d+)", path)
+    if m:
+        return {"board": m.group(1), "job_id": m.group(2)}
+    m = re.match(r"/([^/]+)", path)
+    if m and query.get("gh_jid"):
+        return {"board": m.group(1), "job_id": query["gh_jid"][0]}
+    return None
+
+register(AtsAdapter(
+    "greenhouse",
+    ("boards.greenhouse.io", "job-boards.greenhouse.io"),
+    _greenhouse_match,
+    lambda ids: f"https://boards-api.greenhouse.io/v1/boards/{ids['board']}/jobs/{ids['job_id']}",
+    lambda data, ids: _fields(data, "content", "description")[:1],
+    board_url=lambda ids: f"https://boards-api.greenhouse.io/v1/boards/{ids['board']}/jobs?content=true",
+    board_postings=lambda data: {str(j.get("id")): j for j in data.get("jobs") or [] if isinstance(j, dict)},
+    posting_id=lambda ids: ids["job_id"],
+))
+
+# -------------------------
+# Lever
+#  - https://jobs.lever.co/<company>/<postingId>
+# API: https://api.lever.co/v0/postings/<company>/<postingId>
+# -------------------------
+def _lever_extract(data, ids):
+    parts = _fields(data, "text", "description")
+    # "lists" holds the Requirements/Responsibilities blocks as <li> HTML
+    for block in data.get("lists") or []:
+        if isinstance(block, dict):
+            parts += _fields(block, "text", "content")
+    parts += _fields(data, "additional")
+    return parts
+
+register(AtsAdapter(
+    "lever",
+    ("jobs.lever.co",),
+    lambda path, query, host: (
+        {"company": m.group(1), "posting_id": m.group(2)}
+        if (m := re.match(r"/([^/]+)/([^/?#]+)", path)) else None
+    ),
+    lambda ids: f"https://api.lever.co/v0/postings/{ids['company']}/{ids['posting_id']}",
+    _lever_extract,
+    board_url=lambda ids: f"https://api.lever.co/v0/postings/{ids['company']}?mode=json",
+    board_postings=lambda data: {str(p.get("id")): p for p in data if isinstance(p, dict)} if isinstance(data, list) else {},
+    posting_id=lambda ids: ids["posting_id"],
+))
+
+# -------------------------
+# Ashby
+#  - https://jobs.ashbyhq.com/<org>/<jobId>
+# API (whole board): https://api.ashbyhq.com/posting-api/job-board/<org>
+# -------------------------
+def _ashby_extract(data, ids):
+    for job in data.get("jobs") or []:
+        if isinstance(job, dict) and job.get("id") == ids["job_id"]:
+            return _fields(job, "title") + (_fields(job, "descriptionHtml") or _fields(job, "descriptionPlain"))
+    return []
+
+register(AtsAdapter(
+    "ashby",
+    ("jobs.ashbyhq.com",),
+    lambda path, query, host: (
+        {"org": m.group(1), "job_id": m.group(2)}
+        if (m := re.match(r"/([^/]+)/([0-9a-f-]{36})", path, re.I)) else None
+    ),
+    lambda ids: f"https://api.ashbyhq.com/posting-api/job-board/{ids['org']}",
+    _ashby_extract,
+    # the per-posting endpoint already is the whole board, so jd_extract
+    # fetches it by board_url and picks the posting out of the listing
+    board_url=lambda ids: f"https://api.ashbyhq.com/posting-api/job-board/{ids['org']}",
+    board_postings=lambda data: {str(j.get("id")): {"jobs": [j]} for j in data.get("jobs") or [] if isinstance(j, dict)},
+    posting_id=lambda ids: ids["job_id"],
+))
+
+# -------------------------
+# Workable
+#  - https://apply.workable.com/<account>/j/<shortcode>/
+# API: https://apply.workable.com/api/v2/accounts/<account>/jobs/<shortcode>
+# -------------------------
+register(AtsAdapter(
+    "workable",
+    ("apply.workable.com",),
+    lambda path, query, host: (
+        {"account": m.group(1), "shortcode": m.group(2)}
+        if (m := re.match(r"/([^/]+)/j/([A-Za-z0-9]+)", path)) else None
+    ),
+    lambda ids: f"https://apply.workable.com/api/v2/accounts/{ids['account']}/jobs/{ids['shortcode']}",
+    lambda data, ids: _fields(data, "title", "description", "requirements", "benefits"),
+))
+
+# -------------------------
+# SmartRecruiters
+#  - https://jobs.smartrecruiters.com/<company>/<postingId>-<slug>
+# API: https://api.smartrecruiters.com/v1/companies/<company>/postings/<postingId>
+# -------------------------
+def _smartrecruiters_extract(data, ids):
+    parts = _fields(data, "name")
+    sections = ((data.get("jobAd") or {}).get("sections")) or {}
+    for key in ("jobDescription", "qualifications", "additionalInformation", "companyDescription"):
+        sec = sections.get(key)
+        if isinstance(sec, dict):
+            parts += _fields(sec, "title", "text")
+    return parts
+
+register(AtsAdapter(
+    "smartrecruiters",
+    ("jobs.smartrecruiters.com", "careers.smartrecruiters.com"),
+    lambda path, query, host: (
+        {"company": m.group(1), "posting_id": m.group(2)}
+        if (m := re.match(r"/([^/]+)/(\d+)", path)) else None
+    ),
+    lambda ids: f"https://api.smartrecruiters.com/v1/companies/{ids['company']}/postings/{ids['posting_id']}",
+    _smartrecruiters_extract,
+))
+
+# -------------------------
+# Recruitee
+#  - https://<company>.recruitee.com/o/<slug>
+# API: https://<company>.recruitee.com/api/offers/<slug>
+# -------------------------
+register(AtsAdapter(
+    "recruitee",
+    ("*.recruitee.com",),
+    lambda path, query, host: (
+        {"host": host, "slug": m.group(1)}
+        if (m := re.match(r"/o/([^/?#]+)", path)) else None
+    ),
+    lambda ids: f"https://{ids['host']}/api/offers/{ids['slug']}",
+    lambda data, ids: _fields(data.get("offer") or {}, "title", "description", "requirements"),
+))
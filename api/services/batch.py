@@ -1,12 +1,31 @@
+import asyncio
+import os
 import re
+import tempfile
+import time
 import zipfile
 from io import BytesIO
-from typing import List, Literal
+from typing import IO, AsyncIterator, Iterator, List, Literal
 
-from services.jd_extract import fetch_jd_text
-from services.pdf import render_resume_pdf
+from services import metrics
+from services.jd_extract import board_urls, fetch_jd_text, normalize_url, prefetch_boards
+from services.pdf import render_pdf_bytes
 from core.tailor import tailor_text  # we’ll create this
 
+# Per-stage concurrency for a single batch. Jobs flow through
+# fetch -> tailor -> render independently, so stages of different jobs overlap.
+BATCH_FETCH_CONCURRENCY = int(os.getenv("BATCH_FETCH_CONCURRENCY", "4"))
+BATCH_RENDER_CONCURRENCY = int(os.getenv("BATCH_RENDER_CONCURRENCY", "2"))
+BATCH_LLM_CONCURRENCY = {
+    "ollama": int(os.getenv("BATCH_OLLAMA_CONCURRENCY", "2")),
+    "deepseek": int(os.getenv("BATCH_DEEPSEEK_CONCURRENCY", "8")),
+}
+
+# Finished PDFs waiting to be written to the client are kept in memory up to
+# this many bytes per batch; anything beyond that is spilled to a temp file.
+BATCH_SPOOL_MAX_BYTES = int(os.getenv("BATCH_SPOOL_MAX_BYTES", str(8 * 1024 * 1024)))
+ZIP_CHUNK_SIZE = 64 * 1024
+
 def slugify(s: str) -> str:
     s = s.strip().lower()
     s = re.sub(r"https?://", "", s)
@@ -14,7 +33,62 @@ def slugify(s: str) -> str:
     s = re.sub(r"_+", "_", s).strip("_")
     return s[:60] or "job"
 
-def build_zip(
+# -------------------------
+# Streaming ZIP plumbing
+# -------------------------
+class _ZipSink:
+    # Write-only target for ZipFile. It has no tell()/seek(), so zipfile
+    # switches to streaming mode (data descriptors after each entry).
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self._chunks)
+        self._chunks.clear()
+        return out
+
+class _SpillBudget:
+    # Only touched from the event loop, so no locking needed.
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_memory = 0
+
+    def hold(self, pdf: bytes) -> tuple[IO[bytes], int]:
+        size = len(pdf)
+        if self.in_memory + size <= self.max_bytes:
+            self.in_memory += size
+            return BytesIO(pdf), size
+
+        spill = tempfile.TemporaryFile()
+        spill.write(pdf)
+        spill.seek(0)
+        return spill, 0
+
+    def release(self, held: int):
+        self.in_memory -= held
+
+def _copy_into_zip(zf: zipfile.ZipFile, sink: _ZipSink, name: str, src: IO[bytes]) -> Iterator[bytes]:
+    with zf.open(name, "w") as dst:
+        while True:
+            chunk = src.read(ZIP_CHUNK_SIZE)
+            if not chunk:
+                break
+            dst.write(chunk)
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+async def iter_zip(
     base_resume_text: str,
     job_urls: List[str],
     tolerance: int,
@@ -23,15 +97,43 @@ def build_zip(
     model: str | None = None,
     prompt_mode: Literal["default", "custom"] = "default",
     custom_prompt: str | None = None,
-) -> BytesIO:
-    zip_buf = BytesIO()
-    errors = []
-
-    with zipfile.ZipFile(zip_buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
-        for idx, url in enumerate(job_urls[:10], start=1):
-            try:
-                jd_text = fetch_jd_text(url)
-                resume_txt = tailor_text(
+    cache_mode: Literal["default", "bypass", "force"] = "default",
+    resume_source: Literal["raw", "parsed"] = "raw",
+    tailor_strategy: Literal["single", "sections"] = "single",
+    engine: Literal["llm", "local", "auto"] = "llm",
+) -> AsyncIterator[bytes]:
+    urls = job_urls[:10]
+    fetch_slots = asyncio.Semaphore(max(1, BATCH_FETCH_CONCURRENCY))
+    llm_slots = asyncio.Semaphore(max(1, BATCH_LLM_CONCURRENCY.get(provider, 1)))
+    render_slots = asyncio.Semaphore(max(1, BATCH_RENDER_CONCURRENCY))
+    budget = _SpillBudget(BATCH_SPOOL_MAX_BYTES)
+
+    # Duplicate URLs (after normalization) are collapsed before any work
+    # starts: one job per distinct posting, its result reused for every
+    # position that asked for it.
+    members: dict[str, list[tuple[int, str]]] = {}
+    for idx, url in enumerate(urls, start=1):
+        try:
+            key = normalize_url(url)
+        except ValueError:
+            # malformed (e.g. a non-numeric port): its own job, which fails
+            # in fetch_jd_text and lands in errors.txt
+            key = url
+        members.setdefault(key, []).append((idx, url))
+
+    # Postings that share an ATS board come from one listing call; only their
+    # jobs wait on it, before falling back to their own fetch.
+    on_boards = board_urls(urls)
+    boards = asyncio.create_task(prefetch_boards(urls))
+
+    async def run_job(key: str, url: str) -> tuple[str, tuple[str, IO[bytes], int] | Exception]:
+        try:
+            jd_text = (await boards).get(url.strip()) if url.strip() in on_boards else None
+            if jd_text is None:
+                async with fetch_slots:
+                    jd_text = await fetch_jd_text(url)
+            async with llm_slots:
+                resume_txt = (await tailor_text(
                     base_resume_text,
                     jd_text,
                     tolerance,
@@ -39,20 +141,60 @@ def build_zip(
                     model=model,
                     prompt_mode=prompt_mode,
                     custom_prompt=custom_prompt,
-                ).strip()
+                    cache_mode=cache_mode,
+                    resume_source=resume_source,
+                    tailor_strategy=tailor_strategy,
+                    engine=engine,
+                )).strip()
+            async with render_slots:
+                pdf_bytes = await render_pdf_bytes(resume_txt)
+        except Exception as e:
+            return key, e
+        pdf, held = budget.hold(pdf_bytes)
+        return key, (resume_txt, pdf, held)
+
+    sink = _ZipSink()
+    errors: dict[int, str] = {}
+    t0 = time.perf_counter()
+    metrics.IN_FLIGHT.labels("batch_zip").inc()
 
-                base_name = f"{idx:02d}_{slugify(url)}"
-                pdf = render_resume_pdf(resume_txt).getvalue()
-                zf.writestr(f"{base_name}.pdf", pdf)
+    # One task per distinct job; the stage semaphores decide what actually runs at once.
+    tasks = [asyncio.create_task(run_job(key, group[0][1])) for key, group in members.items()]
+    try:
+        with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            # Entries go out as soon as each job finishes. Names are derived from
+            # the input position, so they stay the same whatever the finish order.
+            for next_done in asyncio.as_completed(tasks):
+                key, result = await next_done
+                metrics.BATCH_ITEMS.labels("batch_zip", "error" if isinstance(result, Exception) else "ok").inc(len(members[key]))
+                if isinstance(result, Exception):
+                    for idx, url in members[key]:
+                        errors[idx] = f"{idx:02d} {url} -> {str(result)}"
+                    continue
 
-                if fmt == "pdf+txt":
-                    zf.writestr(f"{base_name}.txt", resume_txt)
+                resume_txt, pdf, held = result
+                try:
+                    for idx, url in members[key]:
+                        base_name = f"{idx:02d}_{slugify(url)}"
+                        pdf.seek(0)
+                        for data in _copy_into_zip(zf, sink, f"{base_name}.pdf", pdf):
+                            yield data
 
-            except Exception as e:
-                errors.append(f"{idx:02d} {url} -> {str(e)}")
+                        if fmt == "pdf+txt":
+                            zf.writestr(f"{base_name}.txt", resume_txt)
+                            yield sink.drain()
+                finally:
+                    pdf.close()
+                    budget.release(held)
 
-        zf.writestr("errors.txt", "\n".join(errors) if errors else "OK")
-        zf.writestr("base_resume.txt", base_resume_text)
+            zf.writestr("errors.txt", "\n".join(errors[i] for i in sorted(errors)) if errors else "OK")
+            zf.writestr("base_resume.txt", base_resume_text)
 
-    zip_buf.seek(0)
-    return zip_buf
+        yield sink.drain()
+        metrics.ZIP_ASSEMBLY_SECONDS.labels("batch_zip").observe(time.perf_counter() - t0)
+    finally:
+        metrics.IN_FLIGHT.labels("batch_zip").dec()
+        # Client went away early -> stop jobs that are still running.
+        for t in tasks:
+            t.cancel()
+        boards.cancel()
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Optional
+
+from services import metrics
+
+# -------------------------
+# Keys
+# -------------------------
+def content_key(*parts) -> str:
+    # Stable hash of the full request; json keeps "a","bc" distinct from "ab","c".
+    raw = json.dumps(parts, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+# -------------------------
+# Two-tier cache: in-memory LRU + optional sqlite file
+#
+# Async callers use aget/aset: memory hits are served inline and only the
+# sqlite work goes to a thread. The disk tier is trimmed (TTL + LRU) every
+# DISK_EVICT_EVERY writes, or as soon as the running row count passes
+# disk_max_items, down to DISK_LOW_WATER of the limit so the next few writes
+# don't trim again.
+# -------------------------
+DISK_EVICT_EVERY = 256
+DISK_LOW_WATER = 0.9
+
+class TieredCache:
+    def __init__(
+        self,
+        name: str,
+        max_items: int = 256,
+        ttl_seconds: float | None = None,
+        disk_path: str | None = None,
+        disk_max_items: int = 10_000,
+    ):
+        self.name = name
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_items = disk_max_items
+        self._mem: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+        self._lock = Lock()
+        # sqlite access is serialized separately so memory hits never wait on disk
+        self._disk_lock = Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_count = 0
+        self._writes = 0
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            f'CREATE TABLE IF NOT EXISTS "{self.name}" '
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        db.execute(f'CREATE INDEX IF NOT EXISTS "{self.name}_accessed" ON "{self.name}" (accessed)')
+        (self._disk_count,) = db.execute(f'SELECT COUNT(*) FROM "{self.name}"').fetchone()
+        self._db = db
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        value = self._get_mem(key, now)
+        if value is None and self._db is not None:
+            value = self._get_disk(key, now)
+        return self._count(value)
+
+    async def aget(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        value = self._get_mem(key, now)
+        if value is None and self._db is not None:
+            value = await asyncio.to_thread(self._get_disk, key, now)
+        return self._count(value)
+
+    def set(self, key: str, value: bytes):
+        now = time.time()
+        self._remember(key, now, value)
+        if self._db is not None:
+            self._set_disk(key, value, now)
+
+    async def aset(self, key: str, value: bytes):
+        now = time.time()
+        self._remember(key, now, value)
+        if self._db is not None:
+            await asyncio.to_thread(self._set_disk, key, value, now)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._mem.pop(key, None)
+        if self._db is not None:
+            with self._disk_lock:
+                self._db.execute(f'DELETE FROM "{self.name}" WHERE key = ?', (key,))
+
+    def _count(self, value: Optional[bytes]) -> Optional[bytes]:
+        metrics.CACHE_REQUESTS.labels(self.name, "miss" if value is None else "hit").inc()
+        return value
+
+    def _get_mem(self, key: str, now: float) -> Optional[bytes]:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is None:
+                return None
+            created, value = hit
+            if self._expired(created, now):
+                del self._mem[key]
+                return None
+            self._mem.move_to_end(key)
+            return value
+
+    def _get_disk(self, key: str, now: float) -> Optional[bytes]:
+        with self._disk_lock:
+            row = self._db.execute(
+                f'SELECT value, created FROM "{self.name}" WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self._expired(created, now):
+                self._db.execute(f'DELETE FROM "{self.name}" WHERE key = ?', (key,))
+                return None
+            self._db.execute(f'UPDATE "{self.name}" SET accessed = ? WHERE key = ?', (now, key))
+        self._remember(key, created, bytes(value))
+        return bytes(value)
+
+    def _set_disk(self, key: str, value: bytes, now: float):
+        with self._disk_lock:
+            self._db.execute(
+                f'INSERT OR REPLACE INTO "{self.name}" (key, value, created, accessed) VALUES (?, ?, ?, ?)',
+                (key, value, now, now),
+            )
+            # counts replacements too; the next trim corrects it
+            self._disk_count += 1
+            self._writes += 1
+            if self._disk_count > self.disk_max_items or self._writes % DISK_EVICT_EVERY == 0:
+                self._evict_disk(now)
+
+    def _remember(self, key: str, created: float, value: bytes):
+        with self._lock:
+            self._mem[key] = (created, value)
+            self._mem.move_to_end(key)
+            while len(self._mem) > self.max_items:
+                self._mem.popitem(last=False)
+
+    def _evict_disk(self, now: float):
+        # caller holds _disk_lock
+        if self.ttl_seconds is not None:
+            self._db.execute(f'DELETE FROM "{self.name}" WHERE created < ?', (now - self.ttl_seconds,))
+        (count,) = self._db.execute(f'SELECT COUNT(*) FROM "{self.name}"').fetchone()
+        if count > self.disk_max_items:
+            keep = max(1, int(self.disk_max_items * DISK_LOW_WATER))
+            self._db.execute(
+                f'DELETE FROM "{self.name}" WHERE key IN '
+                f'(SELECT key FROM "{self.name}" ORDER BY accessed ASC LIMIT ?)',
+                (count - keep,),
+            )
+            count = keep
+        self._disk_count = count
+
+def env_ttl(name: str, default: str) -> float | None:
+    # "0" or "" disables expiry
+    v = float(os.getenv(name, default) or 0)
+    return v if v > 0 else None
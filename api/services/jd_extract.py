@@ -1,8 +1,16 @@
+import asyncio
 import json
+import os
 import re
-from typing import Optional, Tuple
-import requests
-from bs4 import BeautifulSoup
+import time
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import httpx
+from bs4 import BeautifulSoup, CData, NavigableString, Tag
+
+from services import ats, metrics
+from services.cache import TieredCache, env_ttl
+from services.singleflight import SingleFlight
 
 UA = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -10,15 +18,42 @@ UA = (
     "Chrome/120 Safari/537.36"
 )
 
-SESSION = requests.Session()
-SESSION.headers.update(
-    {
+CLIENT = httpx.AsyncClient(
+    headers={
         "User-Agent": UA,
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         "Accept-Language": "en-US,en;q=0.9",
-    }
+    },
+    follow_redirects=True,
+    timeout=25,
+    limits=httpx.Limits(
+        max_connections=int(os.getenv("JD_MAX_CONNECTIONS", "64")),
+        max_keepalive_connections=int(os.getenv("JD_MAX_KEEPALIVE", "16")),
+    ),
+)
+
+async def aclose():
+    await CLIENT.aclose()
+
+# Fetched postings keyed by normalized URL. Within JD_CACHE_TTL_SECONDS an entry
+# is served as-is; after that it is revalidated with ETag/If-Modified-Since and
+# only re-parsed if the server sends a new body. JD_CACHE_MAX_AGE_SECONDS drops
+# entries completely.
+JD_CACHE_TTL_SECONDS = float(os.getenv("JD_CACHE_TTL_SECONDS", "21600"))
+JD_CACHE = TieredCache(
+    "jd",
+    max_items=int(os.getenv("JD_CACHE_MAX_ITEMS", "128")),
+    ttl_seconds=env_ttl("JD_CACHE_MAX_AGE_SECONDS", str(7 * 24 * 3600)),
+    disk_path=os.getenv("JD_CACHE_PATH") or None,
+    disk_max_items=int(os.getenv("JD_CACHE_DISK_MAX_ITEMS", "5000")),
 )
 
+IN_FLIGHT = SingleFlight()
+# board listings, keyed by board URL: postings of one board share a download
+BOARD_IN_FLIGHT = SingleFlight()
+
+TRACKING_PARAMS = {"gclid", "fbclid", "mc_cid", "mc_eid", "ref", "referrer", "source", "src"}
+
 # -------------------------
 # Small utilities
 # -------------------------
@@ -39,74 +74,109 @@ def _is_probably_jd(text: str) -> bool:
         "responsibil" in t or "requirement" in t or "qualif" in t or "what you will do" in t
     )
 
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not (scheme == "http" and parts.port == 80 or scheme == "https" and parts.port == 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
 # -------------------------
-# ATS: Greenhouse
-# URL patterns:
-#  - https://boards.greenhouse.io/<company>/jobs/<id>
-#  - https://boards.greenhouse.io/<company>/jobs/<id>?gh_jid=<id>
-# API:
-#  - https://boards-api.greenhouse.io/v1/boards/<company>/jobs/<id>
+# Cached HTTP GET with conditional revalidation
 # -------------------------
-def _try_greenhouse(url: str) -> Optional[str]:
-    m = re.search(r"boards\.greenhouse\.io/([^/]+)/jobs/(\d+)", url)
-    if not m:
-        # sometimes only gh_jid exists
-        m2 = re.search(r"boards\.greenhouse\.io/([^/]+)/.*[?&]gh_jid=(\d+)", url)
-        if not m2:
-            return None
-        company, job_id = m2.group(1), m2.group(2)
-    else:
-        company, job_id = m.group(1), m.group(2)
-
-    api = f"https://boards-api.greenhouse.io/v1/boards/{company}/jobs/{job_id}"
-    r = SESSION.get(api, timeout=25)
+async def _cached_fetch(
+        url: str,
+        extract: Callable[[str], Optional[str]],
+        key: str | None = None,
+    ) -> Tuple[int, Optional[str]]:
+    # GET url and run extract() on the body, reusing a cached result when possible.
+    # Returns (status, extracted_text); a fresh or revalidated entry reports 200.
+    # Pass key when one endpoint serves several postings (e.g. a whole board).
+    key = key or normalize_url(url)
+    cached = await JD_CACHE.aget(key)
+    entry = json.loads(cached) if cached is not None else None
+    now = time.time()
+
+    if entry and now - entry["checked_at"] < JD_CACHE_TTL_SECONDS:
+        return 200, entry["text"]
+
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    r = await CLIENT.get(url, headers=headers)
+    if r.status_code == 304 and entry:
+        entry["checked_at"] = now
+        await JD_CACHE.aset(key, json.dumps(entry).encode("utf-8"))
+        return 200, entry["text"]
     if r.status_code != 200:
-        return None
-
-    data = r.json()
-    # Greenhouse description is HTML
-    desc_html = data.get("content") or data.get("description") or ""
-    text = _strip_html(desc_html)
-    return text if _is_probably_jd(text) else None
+        return r.status_code, None
+
+    # parsing is CPU-bound; keep it off the event loop
+    text = await asyncio.to_thread(extract, r.text)
+    if "no-store" not in r.headers.get("Cache-Control", "").lower():
+        entry = {
+            "url": url,
+            "etag": r.headers.get("ETag"),
+            "last_modified": r.headers.get("Last-Modified"),
+            "text": text,
+            "checked_at": now,
+        }
+        await JD_CACHE.aset(key, json.dumps(entry).encode("utf-8"))
+    return 200, text
 
 # -------------------------
-# ATS: Lever
-# URL patterns:
-#  - https://jobs.lever.co/<company>/<postingId>
-# API:
-#  - https://api.lever.co/v0/postings/<company>/<postingId>
+# ATS JSON APIs (see services/ats.py for the per-ATS adapters)
 # -------------------------
-def _try_lever(url: str) -> Optional[str]:
-    m = re.search(r"jobs\.lever\.co/([^/]+)/([^/?#]+)", url)
-    if not m:
-        return None
-    company, posting_id = m.group(1), m.group(2)
-    api = f"https://api.lever.co/v0/postings/{company}/{posting_id}"
-    r = SESSION.get(api, timeout=25)
-    if r.status_code != 200:
-        return None
-
-    data = r.json()
-    # Lever fields vary; description is HTML-ish in some fields
-    parts = []
-    if data.get("text"):
-        parts.append(_strip_html(data["text"]))
-    if data.get("description"):
-        parts.append(_strip_html(data["description"]))
-    if data.get("additional"):
-        parts.append(_strip_html(data["additional"]))
-
+def ats_text(fragments: List[str]) -> Optional[str]:
+    parts = [_strip_html(f) if "<" in f else _clean_ws(f) for f in fragments]
     text = _clean_ws("\n\n".join([p for p in parts if p.strip()]))
     return text if _is_probably_jd(text) else None
 
+async def _try_ats(url: str) -> Optional[Tuple[str, str]]:
+    # (text, adapter name) or None
+    hit = ats.resolve(url)
+    if hit is None:
+        return None
+    adapter, ids = hit
+    api = adapter.api_url(ids)
+    if adapter.board_url is not None and adapter.board_url(ids) == api:
+        # the posting endpoint returns the whole board (Ashby): fetch and
+        # cache the board once and pick this posting out of the listing
+        payload = (await _fetch_board(adapter, ids)).get(adapter.posting_id(ids))
+        if payload is None:
+            return None
+        text = await asyncio.to_thread(lambda: ats_text(adapter.extract(payload, ids)))
+        return (text, adapter.name) if text else None
+    _, text = await _cached_fetch(
+        api,
+        lambda body: ats_text(adapter.extract(json.loads(body), ids)),
+        key=f"{normalize_url(api)}#{adapter.name}:" + ",".join(f"{k}={v}" for k, v in sorted(ids.items())),
+    )
+    return (text, adapter.name) if text else None
+
 # -------------------------
 # JSON-LD schema.org JobPosting
 # -------------------------
+# Script bodies are raw text in HTML (no entities, no nested tags), so a regex
+# finds them without building a DOM for the whole page.
+LD_JSON_RE = re.compile(
+    r"<script\b[^>]*\btype\s*=\s*[\"']?[^\"'>]*ld\+json[^>]*>(.*?)</script\s*>",
+    re.I | re.S,
+)
+
 def _extract_jobposting_jsonld(html: str) -> Optional[str]:
-    soup = BeautifulSoup(html, "lxml")
-    scripts = soup.find_all("script", attrs={"type": re.compile(r"ld\+json", re.I)})
-    for sc in scripts:
-        raw = (sc.string or sc.get_text() or "").strip()
+    for m in LD_JSON_RE.finditer(html):
+        raw = m.group(1).strip()
         if not raw:
             continue
         try:
@@ -136,45 +206,102 @@ def _extract_jobposting_jsonld(html: str) -> Optional[str]:
 # -------------------------
 # HTML fallback (heuristics)
 # -------------------------
-def _extract_best_block(html: str) -> str:
-    soup = BeautifulSoup(html, "lxml")
+# ids/classes that usually wrap the posting body (the old CSS selector list)
+JD_IDS = {"job", "job-description", "job_description", "jobDescriptionText"}
+JD_CLASSES = {
+    "job", "job-description", "jobDescription", "description",
+    "posting", "posting-description", "content", "content-body",
+}
+JD_MARKER_RE = re.compile(r"responsibil|requirement|qualif|what you will do", re.I)
+
+# Only strings at least this long count as body text; short strings are menu
+# items, labels, locations, buttons.
+DENSE_MIN_CHARS = 25
+# A node "covers" the posting if it holds at least this share of the page's
+# body text; the smallest covering node wins. Hinted nodes (main/article, a JD
+# id/class, or containing a Responsibilities/Requirements-style heading)
+# qualify with a lower share.
+MIN_SHARE = 0.75
+MIN_SHARE_HINTED = 0.45
+MAX_LINK_DENSITY = 0.5
+
+def _has_jd_attrs(tag: Tag) -> bool:
+    if tag.name in ("main", "article"):
+        return True
+    if tag.get("id") in JD_IDS or tag.get("data-qa") == "job-description":
+        return True
+    return any(c in JD_CLASSES for c in tag.get("class") or ())
+
+def _score_nodes(root: Tag) -> tuple[list[Tag], dict[int, list[int]]]:
+    # One pre-order walk collects each tag's own counts, then a reverse walk
+    # folds children into parents. Every string is visited exactly once.
+    # Returns (tags in document order,
+    #          id(tag) -> [text_len, link_len, dense_len, has_jd_marker]).
+    order: list[Tag] = []
+    stats: dict[int, list[int]] = {}
+    stack: list[tuple[object, Tag | None, bool]] = [(root, None, False)]
+    while stack:
+        node, parent, in_link = stack.pop()
+        if isinstance(node, Tag):
+            stats[id(node)] = [0, 0, 0, 0]
+            order.append(node)
+            in_link = in_link or node.name == "a"
+            for child in reversed(node.contents):
+                stack.append((child, node, in_link))
+        elif type(node) in (NavigableString, CData) and parent is not None:
+            text = node.strip()
+            n = len(text)
+            if not n:
+                continue
+            st = stats[id(parent)]
+            st[0] += n
+            if in_link:
+                st[1] += n
+            elif n >= DENSE_MIN_CHARS:
+                st[2] += n
+            if n < 80 and JD_MARKER_RE.search(text):
+                st[3] = 1
+
+    for tag in reversed(order):
+        if tag.parent is not None and id(tag.parent) in stats:
+            st, pst = stats[id(tag)], stats[id(tag.parent)]
+            pst[0] += st[0]
+            pst[1] += st[1]
+            pst[2] += st[2]
+            pst[3] |= st[3]
+    return order, stats
+
+def _best_node(root: Tag) -> Optional[Tag]:
+    order, stats = _score_nodes(root)
+    total = stats[id(root)][2]
+    if total <= 0:
+        return None
 
+    best, best_len = None, None
+    for tag in order:
+        t_len, l_len, dense, marker = stats[id(tag)]
+        if dense < 200 or l_len > MAX_LINK_DENSITY * t_len:
+            continue
+        share = MIN_SHARE_HINTED if marker or _has_jd_attrs(tag) else MIN_SHARE
+        if dense < share * total:
+            continue
+        if best_len is None or t_len < best_len:
+            best, best_len = tag, t_len
+    return best
+
+def _extract_best_block(soup: BeautifulSoup) -> str:
+    # NOTE: mutates soup (junk tags are removed)
     # remove junk
     for tag in soup(["script", "style", "noscript", "svg", "nav", "footer", "header", "form"]):
         tag.decompose()
 
-    # good candidates by id/class
-    selectors = [
-        "#job", "#job-description", "#job_description", "#jobDescriptionText",
-        ".job", ".job-description", ".jobDescription", ".description",
-        ".posting", ".posting-description", ".content", ".content-body",
-        "[data-qa='job-description']",
-    ]
-
-    best_text = ""
-    best_len = 0
-
-    # try main/article first
-    for container in [soup.find("main"), soup.find("article"), soup.body]:
-        if not container:
-            continue
-        txt = _clean_ws(container.get_text("\n"))
-        if len(txt) > best_len:
-            best_text, best_len = txt, len(txt)
-
-    # try targeted selectors
-    for sel in selectors:
-        try:
-            nodes = soup.select(sel)
-        except Exception:
-            nodes = []
-        for n in nodes:
-            txt = _clean_ws(n.get_text("\n"))
-            if len(txt) > best_len:
-                best_text, best_len = txt, len(txt)
+    # Score every node in one bottom-up pass and serialize only the winner.
+    root = soup.body or soup
+    best = _best_node(root)
+    best_text = _clean_ws(best.get_text("\n")) if best is not None else ""
 
     # last fallback: whole page text (but cleaned)
-    if best_len < 200:
+    if len(best_text) < 200:
         best_text = _clean_ws(soup.get_text("\n"))
 
     # de-duplicate repeated lines (nav)
@@ -192,36 +319,134 @@ def _extract_best_block(html: str) -> str:
 # -------------------------
 # Public function
 # -------------------------
-def fetch_jd_text(url: str) -> str:
+async def fetch_jd_text(url: str) -> str:
     url = (url or "").strip()
     if not url.startswith(("http://", "https://")):
         raise ValueError("URL must start with http:// or https://")
 
-    # 1) ATS APIs (most reliable)
-    gh = _try_greenhouse(url)
-    if gh:
-        return gh
-
-    lv = _try_lever(url)
-    if lv:
-        return lv
+    # concurrent fetches of the same posting share one network round trip
+    return await IN_FLIGHT.do(normalize_url(url), lambda: _fetch_jd_text(url))
+
+async def _fetch_jd_text(url: str) -> str:
+    t0 = time.perf_counter()
+    strategy = "error"
+    try:
+        with metrics.IN_FLIGHT.labels("jd_fetch").track_inprogress():
+            text, strategy = await _fetch_jd_text_tagged(url)
+        return text
+    finally:
+        metrics.JD_FETCH_SECONDS.labels(strategy).observe(time.perf_counter() - t0)
+
+async def _fetch_jd_text_tagged(url: str) -> Tuple[str, str]:
+    # 1) ATS APIs (most reliable), dispatched by hostname
+    at = await _try_ats(url)
+    if at:
+        return at
+
+    # 2) Normal HTML fetch. Cached as JSON [strategy, text], so a cache hit
+    # still reports which extractor produced the text.
+    status, tagged = await _cached_fetch(
+        url,
+        lambda body: json.dumps(_extract_from_html(body)),
+        key=f"{normalize_url(url)}#html",
+    )
+    if status != 200:
+        raise ValueError(f"fetch failed status={status}")
 
-    # 2) Normal HTML fetch
-    r = SESSION.get(url, timeout=25, allow_redirects=True)
-    if r.status_code != 200:
-        raise ValueError(f"fetch failed status={r.status_code}")
+    strategy, text = json.loads(tagged)
+    if not text or len(text) < 200:
+        raise ValueError("extracted text too short (page may be JS-rendered).")
 
-    html = r.text
+    return text, strategy
 
-    # 3) JSON-LD JobPosting
+# -------------------------
+# Bulk: one listing call per ATS board
+# -------------------------
+JD_BULK_CONCURRENCY = int(os.getenv("JD_BULK_CONCURRENCY", "8"))
+
+async def _fetch_board(adapter: ats.AtsAdapter, ids: dict) -> dict:
+    # {posting id: payload}; the cached "text" is the re-keyed listing, so a
+    # revalidated board skips the JSON walk too
+    url = adapter.board_url(ids)
+    status, text = await BOARD_IN_FLIGHT.do(normalize_url(url), lambda: _cached_fetch(
+        url,
+        lambda body: json.dumps(adapter.board_postings(json.loads(body))),
+    ))
+    return json.loads(text) if status == 200 and text else {}
+
+def _board_groups(urls: List[str]) -> dict[str, list[tuple[str, ats.AtsAdapter, dict]]]:
+    # {board url: [(url, adapter, ids)]} for boards with two or more URLs
+    groups: dict[str, list[tuple[str, ats.AtsAdapter, dict]]] = {}
+    for url in dict.fromkeys(u.strip() for u in urls):
+        try:
+            hit = ats.resolve(url)
+        except ValueError:
+            # malformed URL: fetch_jd_text reports it for that item
+            continue
+        if hit is None or hit[0].board_url is None:
+            continue
+        adapter, ids = hit
+        groups.setdefault(adapter.board_url(ids), []).append((url, adapter, ids))
+    return {board: members for board, members in groups.items() if len(members) >= 2}
+
+def board_urls(urls: List[str]) -> set[str]:
+    # the (stripped) URLs prefetch_boards() may cover; only these are worth
+    # waiting for it, the rest go straight to fetch_jd_text()
+    return {url for members in _board_groups(urls).values() for url, _, _ in members}
+
+async def prefetch_boards(urls: List[str]) -> dict[str, str]:
+    # Group URLs by ATS board and fetch each board listing (with content) once.
+    # Only boards with two or more URLs are worth it; a single posting is
+    # cheaper through its own endpoint. Returns {url: jd_text} for the postings
+    # the listings covered; anything missing falls back to fetch_jd_text().
+    out: dict[str, str] = {}
+
+    async def one_board(members):
+        _, adapter, ids = members[0]
+        t0 = time.perf_counter()
+        try:
+            postings = await _fetch_board(adapter, ids)
+        except Exception:
+            return
+        finally:
+            metrics.JD_FETCH_SECONDS.labels("board").observe(time.perf_counter() - t0)
+        for url, adapter, ids in members:
+            payload = postings.get(adapter.posting_id(ids))
+            if payload is None:
+                continue
+            text = await asyncio.to_thread(lambda: ats_text(adapter.extract(payload, ids)))
+            if text:
+                out[url] = text
+
+    await asyncio.gather(*(one_board(m) for m in _board_groups(urls).values()))
+    return out
+
+async def fetch_jd_texts(urls: List[str]) -> List[str | Exception]:
+    # Like fetch_jd_text for many URLs, in input order; failures are returned
+    # as the exception instead of raised.
+    on_boards = board_urls(urls)
+    boards = asyncio.create_task(prefetch_boards(urls))
+    slots = asyncio.Semaphore(max(1, JD_BULK_CONCURRENCY))
+
+    async def one(url: str) -> str:
+        if url.strip() in on_boards:
+            text = (await boards).get(url.strip())
+            if text is not None:
+                return text
+        async with slots:
+            return await fetch_jd_text(url)
+
+    try:
+        return await asyncio.gather(*(one(u) for u in urls), return_exceptions=True)
+    finally:
+        boards.cancel()
+
+def _extract_from_html(html: str) -> Tuple[str, str]:
+    # (strategy, text)
+    # 3) JSON-LD JobPosting (regex pre-scan, no DOM)
     jl = _extract_jobposting_jsonld(html)
     if jl:
-        return jl
-
-    # 4) Heuristic HTML extraction
-    text = _extract_best_block(html)
-
-    if len(text) < 200:
-        raise ValueError("extracted text too short (page may be JS-rendered).")
+        return "jsonld", jl
 
-    return text
+    # 4) Heuristic HTML extraction; the page is parsed exactly once, here
+    return "heuristic", _extract_best_block(BeautifulSoup(html, "lxml"))
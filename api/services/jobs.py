@@ -0,0 +1,385 @@
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+import zipfile
+from collections import OrderedDict, deque
+from pathlib import Path
+from threading import Lock
+from typing import Iterator, Optional
+
+from fastapi import HTTPException
+
+from core.tailor import tailor_text
+from services import metrics
+from services.batch import _copy_into_zip, _ZipSink, slugify
+from services.jd_extract import board_urls, fetch_jd_text, prefetch_boards
+from services.pdf import render_pdf_bytes
+
+logger = logging.getLogger(__name__)
+
+# Job rows live in sqlite, artifacts (one PDF + TXT per item) as files under
+# JOBS_DIR/<job id>/. Unfinished jobs are picked up again after a restart.
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "data/jobs.sqlite3")
+JOBS_DIR = os.getenv("JOBS_DIR", "data/jobs")
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "4"))
+# finished jobs (and their files) are deleted this long after completion
+JOBS_TTL_SECONDS = float(os.getenv("JOBS_TTL_SECONDS", str(7 * 24 * 3600)))
+# how often expired jobs are looked for while the server runs
+JOBS_PURGE_INTERVAL_SECONDS = float(os.getenv("JOBS_PURGE_INTERVAL_SECONDS", "3600"))
+# an item pushed back by 429/503 + Retry-After this many times fails instead
+JOBS_MAX_DEFERRALS = int(os.getenv("JOBS_MAX_DEFERRALS", "10"))
+
+ACTIVE_ITEM_STATES = ("fetching", "tailoring", "rendering")
+
+def item_name(idx: int, url: str) -> str:
+    # same naming as /batch_zip entries
+    return f"{idx:02d}_{slugify(url)}"
+
+# -------------------------
+# Persistent store. Its methods block on sqlite; async code calls them
+# through asyncio.to_thread.
+# -------------------------
+class JobStore:
+    def __init__(self, db_path: str, artifact_dir: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.artifact_dir = Path(artifact_dir)
+        self.artifact_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, request TEXT NOT NULL, total INTEGER NOT NULL, "
+            "created REAL NOT NULL, updated REAL NOT NULL, finished REAL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS job_items ("
+            "job_id TEXT NOT NULL, idx INTEGER NOT NULL, url TEXT NOT NULL, status TEXT NOT NULL, "
+            "error TEXT, updated REAL NOT NULL, deferrals INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (job_id, idx))"
+        )
+        # databases created before deferrals were counted
+        columns = {r["name"] for r in self._db.execute("PRAGMA table_info(job_items)")}
+        if "deferrals" not in columns:
+            self._db.execute("ALTER TABLE job_items ADD COLUMN deferrals INTEGER NOT NULL DEFAULT 0")
+
+    def create(self, request: dict) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        urls = request["job_urls"]
+        with self._lock:
+            self._db.execute("BEGIN")
+            self._db.execute(
+                "INSERT INTO jobs (id, status, request, total, created, updated) VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, json.dumps(request), len(urls), now, now),
+            )
+            self._db.executemany(
+                "INSERT INTO job_items (job_id, idx, url, status, updated) VALUES (?, ?, ?, 'queued', ?)",
+                [(job_id, idx, url, now) for idx, url in enumerate(urls, start=1)],
+            )
+            self._db.execute("COMMIT")
+        self.job_dir(job_id).mkdir(parents=True, exist_ok=True)
+        return job_id
+
+    def job_dir(self, job_id: str) -> Path:
+        return self.artifact_dir / job_id
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            items = self._db.execute(
+                "SELECT idx, url, status, error FROM job_items WHERE job_id = ? ORDER BY idx", (job_id,)
+            ).fetchall()
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["items"] = [dict(i) for i in items]
+        return job
+
+    def request(self, job_id: str) -> Optional[dict]:
+        # just the submitted request, without the item rows
+        with self._lock:
+            row = self._db.execute("SELECT request FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row["request"]) if row is not None else None
+
+    def set_item(self, job_id: str, idx: int, status: str, error: str | None = None):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE job_items SET status = ?, error = ?, updated = ? WHERE job_id = ? AND idx = ?",
+                (status, error, now, job_id, idx),
+            )
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', updated = ? WHERE id = ? AND status = 'queued'", (now, job_id)
+            )
+
+    def defer_item(self, job_id: str, idx: int) -> int:
+        # back to queued after a Retry-After; returns how often that happened
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "UPDATE job_items SET status = 'queued', deferrals = deferrals + 1, updated = ? WHERE job_id = ? AND idx = ?",
+                (now, job_id, idx),
+            )
+            (deferrals,) = self._db.execute(
+                "SELECT deferrals FROM job_items WHERE job_id = ? AND idx = ?", (job_id, idx)
+            ).fetchone()
+        return deferrals
+
+    def finish_if_complete(self, job_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            (pending,) = self._db.execute(
+                "SELECT COUNT(*) FROM job_items WHERE job_id = ? AND status NOT IN ('done', 'error')", (job_id,)
+            ).fetchone()
+            if pending:
+                return False
+            self._db.execute(
+                "UPDATE jobs SET status = 'done', updated = ?, finished = ? WHERE id = ?", (now, now, job_id)
+            )
+            return True
+
+    def unfinished(self) -> list[tuple[str, list[int]]]:
+        # after a restart: items that were mid-flight go back to queued
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                f"UPDATE job_items SET status = 'queued', updated = ? WHERE status IN ({','.join('?' * len(ACTIVE_ITEM_STATES))})",
+                (now, *ACTIVE_ITEM_STATES),
+            )
+            rows = self._db.execute(
+                "SELECT j.id, i.idx FROM jobs j JOIN job_items i ON i.job_id = j.id "
+                "WHERE j.status IN ('queued', 'running') AND i.status = 'queued' ORDER BY j.created, i.idx"
+            ).fetchall()
+        out: "OrderedDict[str, list[int]]" = OrderedDict()
+        for job_id, idx in rows:
+            out.setdefault(job_id, []).append(idx)
+        return list(out.items())
+
+    def purge(self, older_than_seconds: float):
+        cutoff = time.time() - older_than_seconds
+        with self._lock:
+            ids = [r[0] for r in self._db.execute(
+                "SELECT id FROM jobs WHERE status = 'done' AND finished < ?", (cutoff,)
+            ).fetchall()]
+            for job_id in ids:
+                self._db.execute("DELETE FROM job_items WHERE job_id = ?", (job_id,))
+                self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        for job_id in ids:
+            shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+# -------------------------
+# Scheduling: a fixed worker pool takes items round-robin across jobs, so a
+# 200-URL job can't starve a 3-URL job submitted after it.
+# -------------------------
+class JobQueue:
+    def __init__(self):
+        self.store: JobStore | None = None
+        self._pending: "OrderedDict[str, deque[int]]" = OrderedDict()
+        # per job: board listing prefetch and the URLs it may cover
+        self._boards: dict[str, tuple[asyncio.Task, set[str]]] = {}
+        self._cond: asyncio.Condition | None = None
+        self._workers: list[asyncio.Task] = []
+        self._purger: asyncio.Task | None = None
+        # items waiting out a Retry-After; they hold no worker meanwhile
+        self._deferred: set[asyncio.Task] = set()
+
+    async def start(self, workers: int = JOBS_WORKERS):
+        self.store = await asyncio.to_thread(JobStore, JOBS_DB_PATH, JOBS_DIR)
+        if JOBS_TTL_SECONDS > 0:
+            self._purger = asyncio.create_task(self._purge_loop())
+        self._cond = asyncio.Condition()
+        for job_id, idxs in await asyncio.to_thread(self.store.unfinished):
+            self._pending[job_id] = deque(idxs)
+        if self._pending:
+            logger.info("resuming %d unfinished jobs", len(self._pending))
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(max(1, workers))]
+        metrics.JOBS_QUEUED.set_function(self.queued)
+
+    async def stop(self):
+        # deferred items are still "queued" in the store and resume on restart
+        tasks = self._workers + list(self._deferred) + ([self._purger] if self._purger else [])
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._purger = None
+        self._deferred.clear()
+        for t, _ in self._boards.values():
+            t.cancel()
+        self._boards.clear()
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    async def submit(self, request: dict) -> str:
+        job_id = await asyncio.to_thread(self.store.create, request)
+        async with self._cond:
+            self._pending[job_id] = deque(range(1, len(request["job_urls"]) + 1))
+            self._cond.notify_all()
+        return job_id
+
+    async def _requeue(self, job_id: str, idx: int):
+        async with self._cond:
+            self._pending.setdefault(job_id, deque()).appendleft(idx)
+            self._cond.notify_all()
+
+    def _requeue_later(self, job_id: str, idx: int, delay: float):
+        async def wait():
+            await asyncio.sleep(delay)
+            await self._requeue(job_id, idx)
+
+        task = asyncio.create_task(wait())
+        self._deferred.add(task)
+        task.add_done_callback(self._deferred.discard)
+
+    async def _purge_loop(self):
+        # finished jobs and their files go JOBS_TTL_SECONDS after completion,
+        # checked at startup and every JOBS_PURGE_INTERVAL_SECONDS after
+        while True:
+            try:
+                await asyncio.to_thread(self.store.purge, JOBS_TTL_SECONDS)
+            except Exception:
+                logger.exception("job purge failed")
+            await asyncio.sleep(max(1.0, JOBS_PURGE_INTERVAL_SECONDS))
+
+    def _next(self) -> tuple[str, int]:
+        job_id, idxs = next(iter(self._pending.items()))
+        idx = idxs.popleft()
+        if idxs:
+            self._pending.move_to_end(job_id)
+        else:
+            del self._pending[job_id]
+        return job_id, idx
+
+    async def _worker(self):
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: bool(self._pending))
+                job_id, idx = self._next()
+            try:
+                with metrics.IN_FLIGHT.labels("job_item").track_inprogress():
+                    await self._run_item(job_id, idx)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("job item failed job=%s idx=%d", job_id, idx)
+
+    async def _prefetched(self, job_id: str, urls: list[str], url: str) -> str | None:
+        # one board listing prefetch per job, shared by its items; items not
+        # on a prefetched board don't wait for it
+        if job_id not in self._boards:
+            self._boards[job_id] = (asyncio.create_task(prefetch_boards(urls)), board_urls(urls))
+        task, on_boards = self._boards[job_id]
+        return (await task).get(url.strip()) if url.strip() in on_boards else None
+
+    async def _run_item(self, job_id: str, idx: int):
+        req = await asyncio.to_thread(self.store.request, job_id)
+        if req is None:
+            return
+        url = req["job_urls"][idx - 1]
+        try:
+            await asyncio.to_thread(self.store.set_item, job_id, idx, "fetching")
+            jd_text = await self._prefetched(job_id, req["job_urls"], url)
+            if jd_text is None:
+                jd_text = await fetch_jd_text(url)
+
+            await asyncio.to_thread(self.store.set_item, job_id, idx, "tailoring")
+            resume_txt = (await tailor_text(
+                req["base_resume_text"],
+                jd_text,
+                req["tolerance"],
+                req["provider"],
+                model=req.get("model"),
+                prompt_mode=req.get("prompt_mode", "default"),
+                custom_prompt=req.get("custom_prompt"),
+                cache_mode=req.get("cache_mode", "default"),
+                # jobs stored before the option existed keep their raw-text prompts
+                resume_source=req.get("resume_source", "raw"),
+                tailor_strategy=req.get("tailor_strategy", "single"),
+                engine=req.get("engine", "llm"),
+            )).strip()
+
+            await asyncio.to_thread(self.store.set_item, job_id, idx, "rendering")
+            pdf_bytes = await render_pdf_bytes(resume_txt)
+
+            base = self.store.job_dir(job_id) / item_name(idx, url)
+            await asyncio.to_thread(_write_artifacts, base, pdf_bytes, resume_txt)
+            await asyncio.to_thread(self.store.set_item, job_id, idx, "done")
+            metrics.BATCH_ITEMS.labels("job", "ok").inc()
+        except asyncio.CancelledError:
+            raise
+        except HTTPException as e:
+            if (e.headers or {}).get("Retry-After") and await asyncio.to_thread(self.store.defer_item, job_id, idx) <= JOBS_MAX_DEFERRALS:
+                # provider saturated or paused by its circuit breaker: after
+                # Retry-After the item goes back to the front of its job's
+                # queue; the worker moves on to other items meanwhile
+                self._requeue_later(job_id, idx, float(e.headers["Retry-After"]))
+                return
+            await asyncio.to_thread(self.store.set_item, job_id, idx, "error", str(e.detail))
+            metrics.BATCH_ITEMS.labels("job", "error").inc()
+        except Exception as e:
+            await asyncio.to_thread(self.store.set_item, job_id, idx, "error", str(e))
+            metrics.BATCH_ITEMS.labels("job", "error").inc()
+
+        if await asyncio.to_thread(self.store.finish_if_complete, job_id):
+            boards = self._boards.pop(job_id, None)
+            if boards is not None:
+                boards[0].cancel()
+
+    def queued(self) -> int:
+        return sum(len(q) for q in self._pending.values())
+
+def _write_artifacts(base: Path, pdf: bytes, txt: str):
+    base.parent.mkdir(parents=True, exist_ok=True)
+    base.with_suffix(".pdf").write_bytes(pdf)
+    base.with_suffix(".txt").write_text(txt, encoding="utf-8")
+
+# -------------------------
+# Results
+# -------------------------
+def artifact_path(store: JobStore, job: dict, idx: int, ext: str) -> Optional[Path]:
+    item = next((i for i in job["items"] if i["idx"] == idx), None)
+    if item is None or item["status"] != "done":
+        return None
+    path = store.job_dir(job["id"]) / f"{item_name(idx, item['url'])}.{ext}"
+    return path if path.exists() else None
+
+def iter_job_zip(store: JobStore, job: dict) -> Iterator[bytes]:
+    # Same layout as /batch_zip, built from the stored artifacts in input order.
+    fmt = job["request"].get("format", "pdf")
+    sink = _ZipSink()
+    t0 = time.perf_counter()
+    errors = []
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for item in job["items"]:
+            idx, url = item["idx"], item["url"]
+            if item["status"] == "error":
+                errors.append(f"{idx:02d} {url} -> {item['error']}")
+                continue
+            pdf = artifact_path(store, job, idx, "pdf")
+            if pdf is None:
+                continue
+            base_name = item_name(idx, url)
+            with open(pdf, "rb") as src:
+                yield from _copy_into_zip(zf, sink, f"{base_name}.pdf", src)
+            if fmt == "pdf+txt":
+                zf.write(pdf.with_suffix(".txt"), f"{base_name}.txt")
+                yield sink.drain()
+
+        zf.writestr("errors.txt", "\n".join(errors) if errors else "OK")
+        zf.writestr("base_resume.txt", job["request"]["base_resume_text"])
+    yield sink.drain()
+    metrics.ZIP_ASSEMBLY_SECONDS.labels("job").observe(time.perf_counter() - t0)
+
+JOBS = JobQueue()
@@ -1,39 +1,222 @@
 import os
 import ast
+import asyncio
 import json
-import requests
+import logging
+import time
+from contextlib import contextmanager
+from typing import AsyncIterator
+
+import httpx
 
 
 from fastapi import HTTPException
 from dotenv import load_dotenv
 
+from services import metrics
+from services.admission import admission_from_env, saturated
+from services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    ProviderError,
+    backoff_delay,
+    hedged,
+    is_transient,
+    with_retries,
+)
+from services.cache import TieredCache, content_key, env_ttl
+from services.ollama_pool import OllamaPool
+from services.singleflight import SingleFlight
+
 
 load_dotenv()
 
 
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY")
-DEEPSEEK_URL = "https://api.deepseek.com/v1/chat/completions"
+DEEPSEEK_URL = os.getenv("DEEPSEEK_URL", "https://api.deepseek.com/v1/chat/completions")
 DEFAULT_MODEL = "deepseek-chat"
 
-OLLAMA_URL = "http://localhost:11434/api/chat"
-OLLAMA_MODEL = "llama3.1:8b"
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434").rstrip("/")
+# Comma-separated Ollama servers to spread requests over; defaults to OLLAMA_BASE_URL
+OLLAMA_URLS = [u.strip() for u in os.getenv("OLLAMA_URLS", OLLAMA_BASE_URL).split(",") if u.strip()]
+OLLAMA_HEALTH_INTERVAL_SECONDS = float(os.getenv("OLLAMA_HEALTH_INTERVAL_SECONDS", "10"))
+OLLAMA_HEALTH_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_HEALTH_TIMEOUT_SECONDS", "2"))
+OLLAMA_EJECT_AFTER_FAILURES = int(os.getenv("OLLAMA_EJECT_AFTER_FAILURES", "2"))
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
+# How long Ollama keeps the model (and its prompt KV cache) loaded after a call
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# Models loaded at startup and kept resident (comma-separated)
+OLLAMA_PRELOAD_MODELS = [m.strip() for m in os.getenv("OLLAMA_PRELOAD_MODELS", OLLAMA_MODEL).split(",") if m.strip()]
+# How often to check /api/ps and reload anything Ollama dropped; 0 disables
+OLLAMA_WARM_INTERVAL_SECONDS = float(os.getenv("OLLAMA_WARM_INTERVAL_SECONDS", "300"))
+# Models that get their own metric label; any other model a client names is
+# reported as "other", so the free-form model field can't add series
+METRIC_MODELS = frozenset([DEFAULT_MODEL, OLLAMA_MODEL, *OLLAMA_PRELOAD_MODELS])
 
-def ollama_chat(system: str, user: str, temperature: float = 0.0, model: str | None = None) -> str:
-    payload = {
-        "model": OLLAMA_MODEL,
+logger = logging.getLogger(__name__)
+
+# Responses keyed by a hash of the full request. Memory tier always on; set
+# LLM_CACHE_PATH to a sqlite file to keep entries across restarts.
+LLM_CACHE = TieredCache(
+    "llm",
+    max_items=int(os.getenv("LLM_CACHE_MAX_ITEMS", "256")),
+    ttl_seconds=env_ttl("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)),
+    disk_path=os.getenv("LLM_CACHE_PATH") or None,
+    disk_max_items=int(os.getenv("LLM_CACHE_DISK_MAX_ITEMS", "5000")),
+)
+
+IN_FLIGHT = SingleFlight()
+
+# One pooled keep-alive client for all LLM traffic. Requests waiting on the
+# model hold a socket, not a thread, so a worker can have hundreds in flight.
+CLIENT = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "256")),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "32")),
+    ),
+)
+
+OLLAMA_POOL = OllamaPool(
+    OLLAMA_URLS,
+    CLIENT,
+    OLLAMA_KEEP_ALIVE,
+    eject_after=OLLAMA_EJECT_AFTER_FAILURES,
+    probe_interval_seconds=OLLAMA_HEALTH_INTERVAL_SECONDS,
+    probe_timeout_seconds=OLLAMA_HEALTH_TIMEOUT_SECONDS,
+)
+
+# Concurrency / rate limits per provider; beyond them callers get a 429
+ADMISSION = {
+    "ollama": admission_from_env("ollama", concurrency=4 * len(OLLAMA_URLS), queue=32, max_wait_seconds=60),
+    "deepseek": admission_from_env("deepseek", concurrency=16, queue=64, max_wait_seconds=15),
+}
+
+# Transient failures (transport errors, 5xx/408/425) are retried with jittered
+# exponential backoff; LLM_HEDGE_PERCENTILE > 0 sends a second request when
+# the first is slower than that percentile of recent calls. After
+# LLM_BREAKER_FAILURES consecutive transient failures a provider is skipped
+# for LLM_BREAKER_RESET_SECONDS, and LLM_FALLBACK_PROVIDER (if set) serves
+# calls the other provider couldn't.
+LLM_RETRY_ATTEMPTS = int(os.getenv("LLM_RETRY_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY_SECONDS = float(os.getenv("LLM_RETRY_BASE_DELAY_SECONDS", "0.5"))
+LLM_RETRY_MAX_DELAY_SECONDS = float(os.getenv("LLM_RETRY_MAX_DELAY_SECONDS", "8"))
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))
+LLM_FALLBACK_PROVIDER = os.getenv("LLM_FALLBACK_PROVIDER", "").strip().lower() or None
+
+BREAKERS = {
+    p: CircuitBreaker(
+        p,
+        failure_threshold=int(os.getenv("LLM_BREAKER_FAILURES", "5")),
+        reset_seconds=float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30")),
+    )
+    for p in ("ollama", "deepseek")
+}
+LATENCY = {p: LatencyTracker() for p in ("ollama", "deepseek")}
+
+def _provider(provider: str) -> str:
+    return "deepseek" if provider == "deepseek" else "ollama"
+
+def _admission(provider: str):
+    return ADMISSION[_provider(provider)]
+
+def _retry_after(r: httpx.Response) -> float:
+    # seconds form only; HTTP-date values fall back to a short default
+    try:
+        return float(r.headers.get("Retry-After") or 5)
+    except ValueError:
+        return 5
+
+async def start():
+    await OLLAMA_POOL.start(OLLAMA_PRELOAD_MODELS, OLLAMA_WARM_INTERVAL_SECONDS)
+
+async def aclose():
+    await OLLAMA_POOL.stop()
+    await CLIENT.aclose()
+
+# -------------------------
+# Token usage (incl. provider prompt-cache hits), cumulative per provider/model
+# -------------------------
+USAGE: dict[str, dict[str, int]] = {}
+
+def record_usage(provider: str, model: str, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int):
+    totals = USAGE.setdefault(f"{provider}:{model}", {
+        "requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_prompt_tokens": 0,
+    })
+    totals["requests"] += 1
+    totals["prompt_tokens"] += prompt_tokens
+    totals["completion_tokens"] += completion_tokens
+    totals["cached_prompt_tokens"] += cached_prompt_tokens
+    label = _model_label(model)
+    metrics.LLM_TOKENS.labels(provider, label, "prompt").inc(prompt_tokens)
+    metrics.LLM_TOKENS.labels(provider, label, "completion").inc(completion_tokens)
+    metrics.LLM_TOKENS.labels(provider, label, "cached_prompt").inc(cached_prompt_tokens)
+    logger.info(
+        "llm usage provider=%s model=%s prompt=%d cached=%d completion=%d",
+        provider, model, prompt_tokens, cached_prompt_tokens, completion_tokens,
+    )
+
+def _model_label(model: str) -> str:
+    return model if model in METRIC_MODELS else "other"
+
+def _record_ollama_usage(data: dict):
+    # Ollama reports evaluated prompt tokens only; a KV-cache prefix hit shows
+    # up as a smaller prompt_eval_count, not as a separate field.
+    record_usage("ollama", data.get("model") or OLLAMA_MODEL, data.get("prompt_eval_count") or 0, data.get("eval_count") or 0, 0)
+
+def _record_deepseek_usage(usage: dict | None):
+    if not usage:
+        return
+    record_usage(
+        "deepseek",
+        DEFAULT_MODEL,
+        usage.get("prompt_tokens") or 0,
+        usage.get("completion_tokens") or 0,
+        usage.get("prompt_cache_hit_tokens") or 0,
+    )
+
+def _ollama_payload(system: str, user: str, temperature: float, stream: bool, model: str) -> dict:
+    return {
+        "model": model,
         "messages": [
             {"role": "system", "content": system},
             {"role": "user", "content": user},
         ],
         "options": {"temperature": temperature},
-        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "stream": stream,
     }
 
-    r = requests.post(OLLAMA_URL, json=payload, timeout=180)
-    if r.status_code != 200:
-        raise HTTPException(status_code=500, detail=f"Ollama error: {r.text}")
+def _deepseek_payload(system: str, user: str, temperature: float, stream: bool) -> dict:
+    payload = {
+        "model": DEFAULT_MODEL,
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user},
+        ],
+        "temperature": temperature,
+    }
+    if stream:
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+    return payload
+
+async def ollama_chat(system: str, user: str, temperature: float = 0.0, model: str | None = None) -> str:
+    model = model or OLLAMA_MODEL
+    payload = _ollama_payload(system, user, temperature, stream=False, model=model)
 
-    return r.json()["message"]["content"]
+    async with OLLAMA_POOL.lease() as node:
+        r = await CLIENT.post(f"{node.url}/api/chat", json=payload, timeout=180)
+        if r.status_code >= 500:
+            OLLAMA_POOL.failed(node, f"status={r.status_code}")
+        if r.status_code != 200:
+            raise ProviderError(r.status_code, f"Ollama error: {r.text}")
+        OLLAMA_POOL.succeeded(node)
+        node.models.touch(model)
+
+    data = r.json()
+    _record_ollama_usage(data)
+    return data["message"]["content"]
 
 def extract_json_strict(text: str) -> dict:
     try:
@@ -55,20 +238,12 @@ def extract_json_strict(text: str) -> dict:
             raise ValueError("Model did not return a JSON object.")
         return parsed
 
-def deepseek_chat(system: str, user: str, temperature: float = 0.0) -> str:
+async def deepseek_chat(system: str, user: str, temperature: float = 0.0) -> str:
     if not DEEPSEEK_API_KEY:
         raise HTTPException(500, "DeepSeek API key not configured")
-    print("calling deepseek")
-    payload = {
-        "model": DEFAULT_MODEL,
-        "messages": [
-            {"role": "system", "content": system},
-            {"role": "user", "content": user},
-        ],
-        "temperature": temperature,
-    }
+    payload = _deepseek_payload(system, user, temperature, stream=False)
 
-    r = requests.post(
+    r = await CLIENT.post(
         DEEPSEEK_URL,
         headers={
             "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
@@ -78,18 +253,258 @@ def deepseek_chat(system: str, user: str, temperature: float = 0.0) -> str:
         timeout=60,
     )
 
+    if r.status_code == 429:
+        raise saturated("deepseek", "upstream rate limit", _retry_after(r))
     if r.status_code != 200:
-        raise HTTPException(500, f"DeepSeek error: {r.text}")
+        raise ProviderError(r.status_code, f"DeepSeek error: {r.text}")
 
     data = r.json()
+    _record_deepseek_usage(data.get("usage"))
     return data["choices"][0]["message"]["content"]
 
-def llm_chat(provider: str,
+# -------------------------
+# Streaming variants (token deltas as they arrive)
+# -------------------------
+async def ollama_chat_stream(system: str, user: str, temperature: float = 0.0, model: str | None = None) -> AsyncIterator[str]:
+    model = model or OLLAMA_MODEL
+    payload = _ollama_payload(system, user, temperature, stream=True, model=model)
+
+    async with OLLAMA_POOL.lease() as node, CLIENT.stream("POST", f"{node.url}/api/chat", json=payload, timeout=180) as r:
+        if r.status_code >= 500:
+            OLLAMA_POOL.failed(node, f"status={r.status_code}")
+        if r.status_code != 200:
+            body = (await r.aread()).decode("utf-8", "replace")
+            raise ProviderError(r.status_code, f"Ollama error: {body}")
+        OLLAMA_POOL.succeeded(node)
+
+        # NDJSON: one {"message": {"content": ...}, "done": bool} object per line
+        async for line in r.aiter_lines():
+            if not line.strip():
+                continue
+            chunk = json.loads(line)
+            if chunk.get("error"):
+                raise ProviderError(500, f"Ollama error: {chunk['error']}")
+            delta = (chunk.get("message") or {}).get("content")
+            if delta:
+                yield delta
+            if chunk.get("done"):
+                node.models.touch(model)
+                _record_ollama_usage(chunk)
+                break
+
+async def deepseek_chat_stream(system: str, user: str, temperature: float = 0.0) -> AsyncIterator[str]:
+    if not DEEPSEEK_API_KEY:
+        raise HTTPException(500, "DeepSeek API key not configured")
+    payload = _deepseek_payload(system, user, temperature, stream=True)
+
+    async with CLIENT.stream(
+        "POST",
+        DEEPSEEK_URL,
+        headers={
+            "Authorization": f"Bearer {DEEPSEEK_API_KEY}",
+            "Content-Type": "application/json",
+        },
+        json=payload,
+        timeout=60,
+    ) as r:
+        if r.status_code == 429:
+            raise saturated("deepseek", "upstream rate limit", _retry_after(r))
+        if r.status_code != 200:
+            body = (await r.aread()).decode("utf-8", "replace")
+            raise ProviderError(r.status_code, f"DeepSeek error: {body}")
+
+        # OpenAI-style SSE: "data: {...}" lines, terminated by "data: [DONE]"
+        async for line in r.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            # with include_usage, the last chunk carries usage and no choices
+            _record_deepseek_usage(chunk.get("usage"))
+            choices = chunk.get("choices") or [{}]
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                yield delta
+
+def effective_model(provider: str, model: str | None) -> str:
+    # what actually goes over the wire, so the cache key matches the real request
+    if provider == "deepseek":
+        return DEFAULT_MODEL
+    return model or OLLAMA_MODEL
+
+def _cache_key(provider: str, system: str, user: str, temperature: float, model: str | None, cache_mode: str) -> str | None:
+    # cache_mode: "default" caches deterministic (temperature == 0) calls only,
+    # "force" caches regardless of temperature, "bypass" skips the cache entirely.
+    use_cache = cache_mode == "force" or (cache_mode == "default" and temperature == 0)
+    if not use_cache:
+        return None
+    return content_key(provider, effective_model(provider, model), system, user, temperature)
+
+def _fallback_for(provider: str, error: BaseException) -> str | None:
+    fallback = LLM_FALLBACK_PROVIDER
+    if fallback is None or fallback == _provider(provider):
+        return None
+    if fallback == "deepseek" and not DEEPSEEK_API_KEY:
+        return None
+    if not (is_transient(error) or isinstance(error, CircuitOpenError)):
+        return None
+    logger.warning("llm %s failed (%s), falling back to %s", provider, error, fallback)
+    metrics.LLM_FALLBACKS.labels(_provider(provider), fallback).inc()
+    return fallback
+
+def _settle(breaker: CircuitBreaker, error: BaseException):
+    if is_transient(error):
+        breaker.record_failure()
+    elif isinstance(error, ProviderError):
+        # the provider answered, just not with something we can use
+        breaker.record_success()
+    else:
+        breaker.release()
+
+def _open_breaker(provider: str) -> CircuitBreaker:
+    breaker = BREAKERS[_provider(provider)]
+    if not breaker.allow():
+        raise CircuitOpenError(provider, breaker.retry_after())
+    return breaker
+
+@contextmanager
+def _observe_call(provider: str, model: str | None):
+    t0 = time.perf_counter()
+    outcome = "error"
+    try:
+        with metrics.IN_FLIGHT.labels("llm").track_inprogress():
+            yield
+        outcome = "ok"
+    finally:
+        metrics.LLM_CALL_SECONDS.labels(_provider(provider), _model_label(effective_model(provider, model)), outcome).observe(
+            time.perf_counter() - t0
+        )
+
+async def _attempt(provider: str, system: str, user: str, temperature: float, model: str | None) -> str:
+    # one provider call: breaker check, admission slot, latency sample
+    breaker = _open_breaker(provider)
+    try:
+        async with _admission(provider).slot():
+            t0 = time.monotonic()
+            with _observe_call(provider, model):
+                if provider == "deepseek":
+                    content = await deepseek_chat(system, user, temperature=temperature)
+                else:
+                    content = await ollama_chat(system, user, temperature=temperature, model=model)
+    except BaseException as e:
+        _settle(breaker, e)
+        raise
+    breaker.record_success()
+    LATENCY[_provider(provider)].add(time.monotonic() - t0)
+    return content
+
+async def _resilient_call(provider: str, system: str, user: str, temperature: float, model: str | None) -> str:
+    hedge_delay = None
+    if LLM_HEDGE_PERCENTILE > 0:
+        hedge_delay = LATENCY[_provider(provider)].percentile(LLM_HEDGE_PERCENTILE)
+    return await with_retries(
+        lambda: hedged(
+            lambda: _attempt(provider, system, user, temperature, model),
+            hedge_delay,
+            on_hedge=metrics.LLM_HEDGES.labels(_provider(provider)).inc,
+        ),
+        LLM_RETRY_ATTEMPTS,
+        LLM_RETRY_BASE_DELAY_SECONDS,
+        LLM_RETRY_MAX_DELAY_SECONDS,
+        on_retry=metrics.LLM_RETRIES.labels(_provider(provider)).inc,
+    )
+
+async def llm_chat(provider: str,
         system: str,
         user: str,
         temperature: float = 0.0,
-        model: str | None = None
+        model: str | None = None,
+        cache_mode: str = "default",
     ) -> str:
-    if provider == "deepseek":
-        return deepseek_chat(system, user, temperature=temperature)
-    return ollama_chat(system, user, temperature=temperature, model=model)
+    key = _cache_key(provider, system, user, temperature, model, cache_mode)
+    if key is not None:
+        hit = await LLM_CACHE.aget(key)
+        if hit is not None:
+            metrics.LLM_CACHE_HITS.labels(_provider(provider)).inc()
+            return hit.decode("utf-8")
+
+    async def call() -> str:
+        try:
+            content = await _resilient_call(provider, system, user, temperature, model)
+        except Exception as e:
+            fallback = _fallback_for(provider, e)
+            if fallback is None:
+                raise
+            # not cached: the key describes the provider that was asked for
+            return await _resilient_call(fallback, system, user, temperature, None)
+        if key is not None:
+            await LLM_CACHE.aset(key, content.encode("utf-8"))
+        return content
+
+    if cache_mode == "bypass":
+        return await call()
+    # identical requests already in flight share one provider call
+    flight_key = content_key(provider, effective_model(provider, model), system, user, temperature)
+    return await IN_FLIGHT.do(flight_key, call)
+
+async def _resilient_stream(provider: str, system: str, user: str, temperature: float, model: str | None) -> AsyncIterator[str]:
+    # Retries only while nothing has been sent on; once tokens went out a
+    # failure ends the stream. No hedging for streams.
+    n = max(1, LLM_RETRY_ATTEMPTS)
+    for attempt in range(n):
+        breaker = _open_breaker(provider)
+        if provider == "deepseek":
+            stream = deepseek_chat_stream(system, user, temperature=temperature)
+        else:
+            stream = ollama_chat_stream(system, user, temperature=temperature, model=model)
+
+        started = False
+        try:
+            async with _admission(provider).slot():
+                with _observe_call(provider, model):
+                    async for delta in stream:
+                        started = True
+                        yield delta
+        except BaseException as e:
+            _settle(breaker, e)
+            if started or attempt == n - 1 or not is_transient(e):
+                raise
+            metrics.LLM_RETRIES.labels(_provider(provider)).inc()
+            await asyncio.sleep(backoff_delay(attempt, LLM_RETRY_BASE_DELAY_SECONDS, LLM_RETRY_MAX_DELAY_SECONDS))
+            continue
+        breaker.record_success()
+        return
+
+async def llm_chat_stream(provider: str,
+        system: str,
+        user: str,
+        temperature: float = 0.0,
+        model: str | None = None,
+        cache_mode: str = "default",
+    ) -> AsyncIterator[str]:
+    key = _cache_key(provider, system, user, temperature, model, cache_mode)
+    if key is not None:
+        hit = await LLM_CACHE.aget(key)
+        if hit is not None:
+            metrics.LLM_CACHE_HITS.labels(_provider(provider)).inc()
+            yield hit.decode("utf-8")
+            return
+
+    parts: list[str] = []
+    try:
+        async for delta in _resilient_stream(provider, system, user, temperature, model):
+            parts.append(delta)
+            yield delta
+    except Exception as e:
+        fallback = None if parts else _fallback_for(provider, e)
+        if fallback is None:
+            raise
+        async for delta in _resilient_stream(fallback, system, user, temperature, None):
+            yield delta
+        return
+
+    # only a completed stream is worth caching
+    if key is not None:
+        await LLM_CACHE.aset(key, "".join(parts).encode("utf-8"))
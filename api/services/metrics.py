@@ -0,0 +1,45 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# -------------------------
+# Prometheus metrics, served on GET /metrics
+# -------------------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "API request latency", ["method", "route", "status"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+JD_FETCH_SECONDS = Histogram(
+    "jd_fetch_seconds", "Job description fetch + extraction, by strategy "
+    "(ATS adapter name, board, jsonld, heuristic, error)", ["strategy"],
+    buckets=(0.005, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 25),
+)
+
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_seconds", "Single LLM provider call, excluding admission wait", ["provider", "model", "outcome"],
+    buckets=(0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120, 180),
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the provider", ["provider", "model", "kind"])
+LLM_RETRIES = Counter("llm_retries_total", "Retried LLM calls after a transient failure", ["provider"])
+LLM_HEDGES = Counter("llm_hedges_total", "Hedge requests sent for slow LLM calls", ["provider"])
+LLM_FALLBACKS = Counter("llm_fallbacks_total", "Calls served by the fallback provider", ["provider", "fallback"])
+LLM_REJECTED = Counter("llm_admission_rejected_total", "Calls refused by admission control", ["provider", "reason"])
+LLM_CACHE_HITS = Counter("llm_cache_hits_total", "LLM responses served from cache", ["provider"])
+
+EDUCATION_REMOVED_TOTAL = Counter(
+    "tailor_education_removed_total", "Tailored outputs rejected for dropping EDUCATION", ["provider"],
+)
+
+PDF_RENDER_SECONDS = Histogram(
+    "pdf_render_seconds", "PDF render time (cache misses only)",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "TieredCache lookups", ["cache", "result"])
+
+ZIP_ASSEMBLY_SECONDS = Histogram(
+    "zip_assembly_seconds", "Time to produce a whole batch ZIP", ["kind"],
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 600),
+)
+BATCH_ITEMS = Counter("batch_items_total", "Batch / job items by outcome", ["kind", "outcome"])
+
+IN_FLIGHT = Gauge("in_flight", "Work currently in progress, by stage", ["stage"])
+JOBS_QUEUED = Gauge("jobs_queued_items", "Job items waiting for a worker")
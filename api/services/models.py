@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Ollama model residency
+#
+# Preloads models at startup and re-pins them with keep_alive on an interval,
+# so user requests don't pay the multi-second load after Ollama unloads an
+# idle model. State is tracked per model for the /models endpoint.
+# -------------------------
+class ModelManager:
+    def __init__(self, client: httpx.AsyncClient, base_url: str, keep_alive: str):
+        self.client = client
+        self.base_url = base_url.rstrip("/")
+        self.keep_alive = keep_alive
+        self.state: Dict[str, dict] = {}
+        self.pinned: List[str] = []  # models kept resident; others are just tracked
+        self._warm_task: asyncio.Task | None = None
+
+    def _entry(self, model: str) -> dict:
+        return self.state.setdefault(model, {
+            "state": "unloaded",
+            "last_load_at": None,
+            "last_load_seconds": None,
+            "last_used_at": None,
+            "error": None,
+        })
+
+    async def load(self, model: str) -> bool:
+        entry = self._entry(model)
+        entry["state"] = "loading"
+        t0 = time.monotonic()
+        try:
+            # a generate call without a prompt just loads the model
+            r = await self.client.post(
+                f"{self.base_url}/api/generate",
+                json={"model": model, "keep_alive": self.keep_alive},
+                timeout=300,
+            )
+            if r.status_code != 200:
+                raise RuntimeError(f"status={r.status_code} {r.text[:200]}")
+        except Exception as e:
+            entry.update(state="error", error=str(e))
+            logger.warning("ollama preload failed model=%s: %s", model, e)
+            return False
+
+        entry.update(
+            state="loaded",
+            error=None,
+            last_load_at=time.time(),
+            last_load_seconds=round(time.monotonic() - t0, 3),
+        )
+        logger.info("ollama model loaded model=%s in %.2fs", model, entry["last_load_seconds"])
+        return True
+
+    async def resident(self) -> List[str]:
+        r = await self.client.get(f"{self.base_url}/api/ps", timeout=10)
+        r.raise_for_status()
+        return [m.get("name") or m.get("model") for m in r.json().get("models") or []]
+
+    async def refresh(self):
+        # reload whatever Ollama has dropped since the last check
+        try:
+            loaded = set(await self.resident())
+        except Exception as e:
+            logger.warning("ollama /api/ps failed: %s", e)
+            return
+        for model, entry in list(self.state.items()):
+            if model not in self.pinned:
+                if model not in loaded:
+                    entry["state"] = "unloaded"
+                continue
+            if model in loaded:
+                entry["state"] = "loaded"
+            elif entry["state"] != "loading":
+                entry["state"] = "unloaded"
+                await self.load(model)
+
+    def touch(self, model: str):
+        # a successful chat means the model is resident now
+        entry = self._entry(model)
+        entry["state"] = "loaded"
+        entry["last_used_at"] = time.time()
+
+    async def start(self, models: List[str], interval_seconds: float):
+        # runs in the background so startup (and DeepSeek traffic) doesn't
+        # wait on Ollama; /models shows "loading" until each load finishes
+        self.pinned = list(models)
+        for m in models:
+            self._entry(m)
+        self._warm_task = asyncio.create_task(self._keep_warm(models, interval_seconds))
+
+    async def _keep_warm(self, models: List[str], interval_seconds: float):
+        await asyncio.gather(*(self.load(m) for m in models))
+        while interval_seconds > 0:
+            await asyncio.sleep(interval_seconds)
+            await self.refresh()
+
+    async def stop(self):
+        if self._warm_task is not None:
+            self._warm_task.cancel()
+            self._warm_task = None
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {m: dict(e) for m, e in self.state.items()}
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List
+
+import httpx
+
+from services.models import ModelManager
+
+logger = logging.getLogger(__name__)
+
+# -------------------------
+# Ollama backend pool
+#
+# Requests go to the healthy node with the fewest requests outstanding. A node
+# is ejected after `eject_after` consecutive failures (health probe or real
+# request) and re-admitted by the next successful probe of GET /api/tags.
+# Each node has its own ModelManager, since model residency is per server.
+# -------------------------
+class OllamaNode:
+    def __init__(self, url: str, models: ModelManager):
+        self.url = url
+        self.models = models
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0  # consecutive
+        self.ejected_at: float | None = None
+        self.last_probe_at: float | None = None
+        self.last_error: str | None = None
+
+    def snapshot(self) -> dict:
+        return {
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "consecutive_failures": self.failures,
+            "ejected_at": self.ejected_at,
+            "last_probe_at": self.last_probe_at,
+            "last_error": self.last_error,
+        }
+
+class OllamaPool:
+    def __init__(
+        self,
+        urls: List[str],
+        client: httpx.AsyncClient,
+        keep_alive: str,
+        eject_after: int = 2,
+        probe_interval_seconds: float = 10,
+        probe_timeout_seconds: float = 2,
+    ):
+        self.client = client
+        self.nodes = [OllamaNode(u.rstrip("/"), ModelManager(client, u, keep_alive)) for u in urls]
+        self.eject_after = max(1, eject_after)
+        self.probe_interval_seconds = probe_interval_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self._probe_task: asyncio.Task | None = None
+
+    # ---- scheduling ----
+    def pick(self) -> OllamaNode:
+        candidates = [n for n in self.nodes if n.healthy]
+        if not candidates:
+            # everything ejected: still try, so callers get the real error
+            # rather than a synthetic one
+            candidates = self.nodes
+        # least outstanding; total requests breaks ties so idle nodes rotate
+        return min(candidates, key=lambda n: (n.outstanding, n.requests))
+
+    @asynccontextmanager
+    async def lease(self) -> AsyncIterator[OllamaNode]:
+        node = self.pick()
+        node.outstanding += 1
+        node.requests += 1
+        try:
+            yield node
+        except httpx.TransportError as e:
+            self.failed(node, f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            node.outstanding -= 1
+
+    # ---- health ----
+    def succeeded(self, node: OllamaNode):
+        node.failures = 0
+        node.last_error = None
+
+    def failed(self, node: OllamaNode, error: str):
+        node.failures += 1
+        node.last_error = error
+        if node.healthy and node.failures >= self.eject_after:
+            node.healthy = False
+            node.ejected_at = time.time()
+            logger.warning("ollama node ejected url=%s after %d failures: %s", node.url, node.failures, error)
+
+    async def probe(self, node: OllamaNode):
+        node.last_probe_at = time.time()
+        try:
+            r = await self.client.get(f"{node.url}/api/tags", timeout=self.probe_timeout_seconds)
+            if r.status_code != 200:
+                raise RuntimeError(f"status={r.status_code}")
+        except Exception as e:
+            self.failed(node, f"probe: {type(e).__name__}: {e}")
+            return
+        self.succeeded(node)
+        if not node.healthy:
+            node.healthy = True
+            node.ejected_at = None
+            logger.info("ollama node re-admitted url=%s", node.url)
+
+    async def probe_all(self):
+        await asyncio.gather(*(self.probe(n) for n in self.nodes))
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.probe_interval_seconds)
+            await self.probe_all()
+
+    # ---- lifecycle ----
+    async def start(self, preload_models: List[str], warm_interval_seconds: float):
+        for n in self.nodes:
+            await n.models.start(preload_models, warm_interval_seconds)
+        if self.probe_interval_seconds > 0:
+            self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def stop(self):
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+        for n in self.nodes:
+            await n.models.stop()
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {n.url: n.snapshot() for n in self.nodes}
+
+    def models_snapshot(self) -> Dict[str, dict]:
+        return {n.url: n.models.snapshot() for n in self.nodes}
@@ -1,31 +1,124 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import LETTER
 from reportlab.lib.units import inch
 
+from services import metrics
+from services.cache import TieredCache, content_key
+from services.singleflight import SingleFlight
+
 
 SECTION_HEADERS = {
     "SUMMARY", "EDUCATION", "EXPERIENCE", "SKILLS", "PROJECTS", "CERTIFICATIONS", "AWARDS"
 }
 
+# Page geometry and typography. Part of the render cache key, so any change
+# here invalidates previously cached PDFs.
+LAYOUT = {
+    "pagesize": LETTER,
+    "margin_left": 0.75 * inch,
+    "margin_right": 0.75 * inch,
+    "margin_top": 0.75 * inch,
+    "margin_bottom": 0.75 * inch,
+    "font_body": "Helvetica",
+    "font_bold": "Helvetica-Bold",
+    "body_size": 10.5,
+    "header_size": 12.5,
+    "leading": 13.5,
+}
+
+# Rendering runs in worker processes so ReportLab doesn't hold the API's GIL.
+# PDF_RENDER_WORKERS=0 renders in a thread of the API process instead.
+PDF_RENDER_WORKERS = int(os.getenv("PDF_RENDER_WORKERS", str(min(4, os.cpu_count() or 1))))
+RENDER_CACHE = TieredCache(
+    "pdf",
+    max_items=int(os.getenv("PDF_CACHE_MAX_ITEMS", "64")),
+    disk_path=os.getenv("PDF_CACHE_PATH") or None,
+    disk_max_items=int(os.getenv("PDF_CACHE_DISK_MAX_ITEMS", "1000")),
+)
+_POOL: ProcessPoolExecutor | None = None
+IN_FLIGHT = SingleFlight()
+
+# Word widths per (font, size), shared across renders. Resumes reuse a small
+# vocabulary, so this stays small; it is reset if it ever grows past the cap.
+_WORD_WIDTHS: dict[tuple[str, float], dict[str, float]] = {}
+_WORD_WIDTHS_MAX = 50_000
+
+def _widths_for(font: str, size: float) -> dict[str, float]:
+    table = _WORD_WIDTHS.get((font, size))
+    if table is None or len(table) > _WORD_WIDTHS_MAX:
+        table = _WORD_WIDTHS[(font, size)] = {}
+    return table
+
+class TextWrapper:
+    # Greedy word wrap in one pass over the words: each word is measured once
+    # (and cached), and line widths are accumulated instead of re-measuring the
+    # growing line. Results are memoized so a measure pass and the following
+    # draw pass share the same work. One instance per render.
+    def __init__(self):
+        self._wrapped: dict[tuple[str, str, float, float], list[str]] = {}
+
+    def wrap(self, text: str, font: str, size: float, avail_width: float) -> list[str]:
+        key = (text, font, size, avail_width)
+        hit = self._wrapped.get(key)
+        if hit is not None:
+            return hit
+
+        words = text.split()
+        if not words:
+            lines = [""]
+        else:
+            widths = _widths_for(font, size)
+            space_w = widths.get(" ")
+            if space_w is None:
+                space_w = widths[" "] = stringWidth(" ", font, size)
+
+            lines = []
+            cur = [words[0]]
+            cur_w = widths.get(words[0])
+            if cur_w is None:
+                cur_w = widths[words[0]] = stringWidth(words[0], font, size)
+            for w in words[1:]:
+                w_w = widths.get(w)
+                if w_w is None:
+                    w_w = widths[w] = stringWidth(w, font, size)
+                if cur_w + space_w + w_w <= avail_width:
+                    cur.append(w)
+                    cur_w += space_w + w_w
+                else:
+                    lines.append(" ".join(cur))
+                    cur = [w]
+                    cur_w = w_w
+            lines.append(" ".join(cur))
+
+        self._wrapped[key] = lines
+        return lines
+
 def render_resume_pdf(resume_text: str) -> BytesIO:
     buf = BytesIO()
-    c = canvas.Canvas(buf, pagesize=LETTER)
-    width, height = LETTER
+    c = canvas.Canvas(buf, pagesize=LAYOUT["pagesize"])
+    width, height = LAYOUT["pagesize"]
+    wrapper = TextWrapper()
 
     # margins
-    left = 0.75 * inch
-    right = 0.75 * inch
-    top = 0.75 * inch
-    bottom = 0.75 * inch
+    left = LAYOUT["margin_left"]
+    right = LAYOUT["margin_right"]
+    top = LAYOUT["margin_top"]
+    bottom = LAYOUT["margin_bottom"]
 
     # typography
-    font_body = "Helvetica"
-    font_bold = "Helvetica-Bold"
-    body_size = 10.5
-    header_size = 12.5
-    leading = 13.5
+    font_body = LAYOUT["font_body"]
+    font_bold = LAYOUT["font_bold"]
+    body_size = LAYOUT["body_size"]
+    header_size = LAYOUT["header_size"]
+    leading = LAYOUT["leading"]
 
     # layout
     y = height - top
@@ -41,21 +134,7 @@ def render_resume_pdf(resume_text: str) -> BytesIO:
         if y - (leading * lines_needed) <= bottom:
             new_page()
 
-    def wrap_text(text: str, font: str, size: float, avail_width: float) -> list[str]:
-        words = text.split()
-        if not words:
-            return [""]
-        lines: list[str] = []
-        cur = words[0]
-        for w in words[1:]:
-            test = cur + " " + w
-            if c.stringWidth(test, font, size) <= avail_width:
-                cur = test
-            else:
-                lines.append(cur)
-                cur = w
-        lines.append(cur)
-        return lines
+    wrap_text = wrapper.wrap
 
     def draw_line(text: str, font: str, size: float, x: float, avail_width: float):
         nonlocal y
@@ -238,3 +317,47 @@ def render_resume_pdf(resume_text: str) -> BytesIO:
     c.save()
     buf.seek(0)
     return buf
+
+# -------------------------
+# Pooled + cached rendering
+# -------------------------
+def render_key(resume_text: str) -> str:
+    return content_key("pdf", LAYOUT, resume_text)
+
+def _render_bytes(resume_text: str) -> bytes:
+    return render_resume_pdf(resume_text).getvalue()
+
+def _pool() -> ProcessPoolExecutor:
+    global _POOL
+    if _POOL is None:
+        # spawn, not fork: the API process has live threads and an event loop
+        _POOL = ProcessPoolExecutor(
+            max_workers=PDF_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _POOL
+
+async def render_pdf_bytes(resume_text: str) -> bytes:
+    key = render_key(resume_text)
+    hit = await RENDER_CACHE.aget(key)
+    if hit is not None:
+        return hit
+
+    async def render() -> bytes:
+        t0 = time.perf_counter()
+        with metrics.IN_FLIGHT.labels("pdf_render").track_inprogress():
+            if PDF_RENDER_WORKERS > 0:
+                pdf = await asyncio.get_running_loop().run_in_executor(_pool(), _render_bytes, resume_text)
+            else:
+                pdf = await asyncio.to_thread(_render_bytes, resume_text)
+        metrics.PDF_RENDER_SECONDS.observe(time.perf_counter() - t0)
+        await RENDER_CACHE.aset(key, pdf)
+        return pdf
+
+    return await IN_FLIGHT.do(key, render)
+
+def shutdown():
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown(wait=False, cancel_futures=True)
+        _POOL = None
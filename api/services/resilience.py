@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth another try; anything else (bad request, unknown
+# model, auth) fails the same way every time.
+RETRYABLE_STATUS = {408, 425, 500, 502, 503, 504}
+
+class ProviderError(HTTPException):
+    # A non-200 from an LLM provider. Still a 500 to our clients, but keeps
+    # the upstream status so retries and the breaker can tell blips from bugs.
+    def __init__(self, upstream_status: int, detail: str):
+        super().__init__(status_code=500, detail=detail)
+        self.upstream_status = upstream_status
+
+class CircuitOpenError(HTTPException):
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(
+            status_code=503,
+            detail=f"{provider} is failing, calls paused",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+def is_transient(e: BaseException) -> bool:
+    if isinstance(e, httpx.TransportError):
+        return True
+    return isinstance(e, ProviderError) and e.upstream_status in RETRYABLE_STATUS
+
+# -------------------------
+# Retries with full-jitter exponential backoff
+# -------------------------
+def backoff_delay(attempt: int, base_seconds: float, max_seconds: float) -> float:
+    return random.uniform(0, min(max_seconds, base_seconds * 2 ** attempt))
+
+async def with_retries(
+    fn: Callable[[], Awaitable[T]],
+    attempts: int,
+    base_seconds: float,
+    max_seconds: float,
+    on_retry: Callable[[], None] | None = None,
+) -> T:
+    n = max(1, attempts)
+    for attempt in range(n):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == n - 1 or not is_transient(e):
+                raise
+            delay = backoff_delay(attempt, base_seconds, max_seconds)
+            logger.info("llm call failed (%s), retry %d in %.2fs", e, attempt + 1, delay)
+            if on_retry is not None:
+                on_retry()
+            await asyncio.sleep(delay)
+
+# -------------------------
+# Hedging: if the first call is slower than `delay`, start a second one and
+# take whichever succeeds first.
+# -------------------------
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self._samples: deque[float] = deque(maxlen=window)
+
+    def add(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: int = 20) -> float | None:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+async def hedged(
+    fn: Callable[[], Awaitable[T]],
+    delay: float | None,
+    on_hedge: Callable[[], None] | None = None,
+) -> T:
+    if delay is None:
+        return await fn()
+
+    first = asyncio.ensure_future(fn())
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+
+    logger.info("llm call slower than %.2fs, sending hedge", delay)
+    if on_hedge is not None:
+        on_hedge()
+    pending = {first, asyncio.ensure_future(fn())}
+    error: BaseException | None = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    return t.result()
+                error = error or t.exception()
+        raise error
+    finally:
+        for t in pending:
+            t.cancel()
+
+# -------------------------
+# Circuit breaker: after `failure_threshold` consecutive transient failures
+# the provider is skipped for `reset_seconds`, then one trial call decides
+# whether it closes again.
+# -------------------------
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_seconds: float = 30):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._trial_running = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_running:
+            self._trial_running = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0
+        return max(1.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info("circuit closed provider=%s", self.name)
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_running or (self.opened_at is None and self.failures >= self.failure_threshold):
+            logger.warning("circuit open provider=%s after %d failures", self.name, self.failures)
+            self.opened_at = time.monotonic()
+        self._trial_running = False
+
+    def release(self):
+        # the call never reached the provider (e.g. rejected by admission)
+        self._trial_running = False
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "consecutive_failures": self.failures}
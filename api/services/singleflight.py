@@ -0,0 +1,26 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, TypeVar
+
+T = TypeVar("T")
+
+# -------------------------
+# Request coalescing
+#
+# Concurrent callers asking for the same key share one underlying call and its
+# result (or exception). The shared call is shielded, so one caller going away
+# (e.g. a client disconnect) doesn't cancel it for the others.
+# -------------------------
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(fn())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(fut)
+
+    def in_flight(self) -> int:
+        return len(self._inflight)